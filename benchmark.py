@@ -0,0 +1,262 @@
+# Camera-free benchmarks for the capture and GIF-building code.
+#
+# Everything runs on synthetic frames from fake_camera.FakeVideoCapture, so
+# this works on any machine (including CI without a webcam). It times:
+#
+#   capture   - FrameSource.read() overhead on top of a raw VideoCapture read
+#   overlay   - draw_overlay() from main.py, against plain cv2.putText bars
+#   jpeg      - JPEG encoding, writing to disk, and the whole CapturePipeline
+#   exposure  - exposure correction on 960px frames, against ImageEnhance
+#   assembly  - building the GIF and the MP4 from N frames, for each N in --sizes
+#
+# Results are printed and written as JSON (--out) so runs can be compared.
+#
+# Usage:
+#   python benchmark.py
+#   python benchmark.py --sizes 10,100,1000,10000 --width 1920 --height 1080 --out results.json
+#
+# Required libraries: opencv-python, Pillow, NumPy
+
+from PIL import Image, ImageEnhance
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from fake_camera import FakeVideoCapture
+from frame_source import FrameSource
+from capture_pipeline import CapturePipeline
+from exposure_lut import apply_exposure
+from frame_store import FrameStoreWriter
+from frame_loader import iter_frames, default_workers
+from gif_writer import GifStreamWriter
+from video_writer import VideoStreamWriter
+from palette import GlobalPalette, sample_evenly
+from frame_dedup import NearDuplicateFilter
+import main as capture_main
+
+# Distinct encoded frames in the assembly benchmark's frame store; longer
+# sessions cycle through them (decoding and encoding still happen per frame)
+ASSEMBLY_UNIQUE_FRAMES = 40
+
+
+def timings(fn, calls):
+    """Calls fn() `calls` times and returns per-call statistics in milliseconds."""
+    times = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    times = np.asarray(times)
+    return {
+        "calls": calls,
+        "mean_ms": round(float(times.mean()), 4),
+        "median_ms": round(float(np.median(times)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+        "max_ms": round(float(times.max()), 4),
+    }
+
+
+def fake_camera(args, **kwargs):
+    return FakeVideoCapture(width=args.width, height=args.height, noise=args.noise, **kwargs)
+
+
+# --- Benchmarks ---
+def bench_capture(args):
+    raw = fake_camera(args, fps=None)
+    results = {"raw_read": timings(raw.read, args.calls)}
+    buffer = np.empty((args.height, args.width, 3), dtype=np.uint8)
+    results["raw_read_into_buffer"] = timings(lambda: raw.read(buffer), args.calls)
+    for freshness in ("none", "flush"):
+        source = FrameSource(freshness=freshness, capture=fake_camera(args, fps=None))
+        results[f"frame_source_{freshness}"] = timings(source.read, args.calls)
+        source.release()
+    # The grabber waits for a frame that starts after the request, so pace the camera like a real one
+    source = FrameSource(freshness="grabber", capture=fake_camera(args, fps=args.fps))
+    results["frame_source_grabber"] = timings(source.read, min(args.calls, 60))
+    results["frame_source_grabber"]["latency_mean_ms"] = round(1000 * float(np.mean(source.latencies)), 4)
+    source.release()
+    for name in ("none", "flush"):
+        results[f"frame_source_{name}"]["overhead_ms"] = round(
+            results[f"frame_source_{name}"]["median_ms"] - results["raw_read"]["median_ms"], 4)
+    return results
+
+
+def bench_overlay(args):
+    _, frame = fake_camera(args, fps=None).read()
+    seconds = iter(range(10 ** 9))
+
+    def overlay_lines():
+        # Like main.py: a minutes line that rarely changes and a timestamp that always does
+        second = next(seconds)
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1700000000 + second))
+        return [(f"{second // 60} mins", capture_main.PRIMARY_FONT_SCALE, capture_main.PRIMARY_FONT_THICKNESS),
+                (timestamp, capture_main.PRIMARY_FONT_SCALE, capture_main.PRIMARY_FONT_THICKNESS)]
+
+    def plain_bars():
+        # What draw_text_with_bg did before the sprite cache
+        y = capture_main.START_Y
+        for text, scale, thickness in overlay_lines():
+            (w, h), baseline = cv2.getTextSize(text, capture_main.FONT, scale, thickness)
+            pad = capture_main.PADDING
+            cv2.rectangle(frame, (capture_main.START_X, y),
+                          (capture_main.START_X + w + pad * 2, y + h + baseline + pad * 2), (0, 0, 0), -1)
+            cv2.putText(frame, text, (capture_main.START_X + pad, y + h + pad + baseline // 2),
+                        capture_main.FONT, scale, (255, 255, 255), thickness)
+            y += h + baseline + pad * 2 + capture_main.LINE_GAP
+
+    return {
+        "draw_overlay": timings(lambda: capture_main.draw_overlay(frame, overlay_lines()), args.calls),
+        "plain_puttext": timings(plain_bars, args.calls),
+    }
+
+
+def bench_jpeg(args, workdir):
+    camera = fake_camera(args, fps=None)
+    _, frame = camera.read()
+    params = [cv2.IMWRITE_JPEG_QUALITY, 95]
+    encode = timings(lambda: cv2.imencode(".jpg", frame, params), args.calls)
+    data = cv2.imencode(".jpg", frame, params)[1].tobytes()
+    encode["mb_per_s"] = round(frame.nbytes / (1024 * 1024) / (encode["median_ms"] / 1000), 1)
+    encode["jpeg_kb"] = round(len(data) / 1024, 1)
+
+    names = iter(range(10 ** 9))
+
+    def write():
+        with open(os.path.join(workdir, f"write_{next(names)}.jpg"), "wb") as f:
+            f.write(data)
+
+    results = {"encode": encode, "write": timings(write, args.calls)}
+
+    # The whole background pipeline: overlay, encode and write, as fast as it will go
+    pipeline = CapturePipeline(render=lambda job: capture_main.draw_overlay(job.frame, job.info["lines"]),
+                               drop_policy="block")
+    lines = [("1 min", capture_main.PRIMARY_FONT_SCALE, capture_main.PRIMARY_FONT_THICKNESS)]
+    started = time.perf_counter()
+    for i in range(args.calls):
+        _, frame = camera.read()
+        pipeline.submit(frame, os.path.join(workdir, f"pipeline_{i}.jpg"), lines=lines)
+    pipeline.close()
+    elapsed = time.perf_counter() - started
+    results["pipeline"] = {"frames": pipeline.written, "seconds": round(elapsed, 3),
+                           "fps": round(pipeline.written / elapsed, 1)}
+    return results
+
+
+def bench_exposure(args):
+    _, frame = fake_camera(args, fps=None).read()
+    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    img = img.resize((960, int(960 * args.height / args.width)), Image.Resampling.LANCZOS)
+    return {
+        "lut_factor": timings(lambda: apply_exposure(img, 1.5), args.calls),
+        "lut_auto": timings(lambda: apply_exposure(img, "auto"), args.calls),
+        "image_enhance": timings(lambda: ImageEnhance.Brightness(img).enhance(1.5), args.calls),
+    }
+
+
+def bench_assembly(args, sizes, workdir):
+    # A small frame store of a session where the sitter shifts every 10 frames
+    store_path = os.path.join(workdir, "bench.frames")
+    camera = fake_camera(args, fps=None, move_every=10)
+    store = FrameStoreWriter(store_path)
+    for i in range(ASSEMBLY_UNIQUE_FRAMES):
+        _, frame = camera.read()
+        capture_main.draw_overlay(frame, [(f"{i} mins", capture_main.PRIMARY_FONT_SCALE,
+                                           capture_main.PRIMARY_FONT_THICKNESS)])
+        store.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes(), 0.0, float(i))
+    store.close()
+
+    workers = args.workers or default_workers()
+    results = {}
+    for n in sizes:
+        frames = [(store_path, i % ASSEMBLY_UNIQUE_FRAMES) for i in range(n)]
+
+        started = time.perf_counter()
+        gif_path = os.path.join(workdir, f"bench_{n}.gif")
+        samples = sample_evenly(frames, 16)
+        palette = GlobalPalette.from_frames(iter_frames(samples, 960, workers), 255)
+        deduplicator = NearDuplicateFilter(ignore_region=(0.0, 0.0, 0.6, 0.3))
+        with GifStreamWriter(gif_path, palette=palette, transparent_deltas=True, delta_tolerance=24) as gif:
+            for frame, duration in deduplicator.collapse(iter_frames(frames, 960, workers), 200):
+                gif.append(frame, duration)
+        gif_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        video_path = os.path.join(workdir, f"bench_{n}.mp4")
+        with VideoStreamWriter(video_path, fps=5) as video:
+            for frame in iter_frames(frames, 960, workers):
+                video.append(frame)
+        video_seconds = time.perf_counter() - started
+
+        results[str(n)] = {
+            "gif": {"seconds": round(gif_seconds, 3), "fps": round(n / gif_seconds, 1),
+                    "bytes": os.path.getsize(gif_path), "frames_kept": deduplicator.frames_out},
+            "mp4": {"seconds": round(video_seconds, 3), "fps": round(n / video_seconds, 1),
+                    "bytes": os.path.getsize(video_path)},
+        }
+        os.remove(gif_path)
+        os.remove(video_path)
+    return results
+
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Time the capture and GIF-building code on synthetic frames.")
+    parser.add_argument("--width", type=int, default=1280, help="fake camera frame width")
+    parser.add_argument("--height", type=int, default=720, help="fake camera frame height")
+    parser.add_argument("--noise", type=float, default=3.0, help="sensor noise (standard deviation, 0-255)")
+    parser.add_argument("--fps", type=float, default=30.0, help="fake camera frame rate for the grabber benchmark")
+    parser.add_argument("--calls", type=int, default=200, help="repetitions for the per-frame benchmarks")
+    parser.add_argument("--sizes", default="10,100,1000", help="session lengths (frames) for the assembly benchmark")
+    parser.add_argument("--workers", type=int, default=None, help="decode workers (default: one per CPU core)")
+    parser.add_argument("--only", default=None, help="comma-separated subset: capture,overlay,jpeg,exposure,assembly")
+    parser.add_argument("--out", default="benchmark_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    selected = args.only.split(",") if args.only else ["capture", "overlay", "jpeg", "exposure", "assembly"]
+    workdir = tempfile.mkdtemp(prefix="timelapse_bench_")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "pillow": Image.__version__,
+            "cpu_count": os.cpu_count(),
+            "frame_size": [args.width, args.height],
+            "noise": args.noise,
+        },
+        "results": {},
+    }
+    benchmarks = {
+        "capture": lambda: bench_capture(args),
+        "overlay": lambda: bench_overlay(args),
+        "jpeg": lambda: bench_jpeg(args, workdir),
+        "exposure": lambda: bench_exposure(args),
+        "assembly": lambda: bench_assembly(args, sizes, workdir),
+    }
+    try:
+        for name in selected:
+            print(f"Running {name} benchmark...")
+            started = time.perf_counter()
+            report["results"][name] = benchmarks[name]()
+            print(json.dumps(report["results"][name], indent=2))
+            print(f"✨ {name} done in {time.perf_counter() - started:.1f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✨ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
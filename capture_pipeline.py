@@ -0,0 +1,185 @@
+# Pipelined capture: camera reads never wait for overlays, JPEG encoding or disk.
+#
+# The capture loop (the reader) only grabs frames and submits them. From there:
+#
+#   reader --[render queue]--> render/encode workers --[write queue]--> writer
+#
+# The workers draw the overlay and JPEG-encode the frame (OpenCV releases the
+# GIL for both, so a small thread pool really runs in parallel). A single
+# writer thread puts the bytes on disk in capture order.
+#
+# Both queues are bounded. When storage can't keep up, the write queue fills,
+# the workers block, the render queue fills, and then the drop policy decides
+# what happens to the next frame the reader submits:
+#   "drop_oldest" - throw away the oldest frame still waiting to be rendered
+#   "drop_newest" - throw away the frame being submitted
+#   "block"       - make the reader wait (capture slows down to disk speed)
+#
+# Required library: opencv-python
+
+import cv2
+import queue
+import threading
+
+from stage_timing import NULL_TIMINGS
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+# How long close() waits for each stage to finish its queued frames
+CLOSE_TIMEOUT_S = 60
+
+_STOP = object()
+
+
+class CaptureJob:
+    """One captured frame on its way through the pipeline."""
+
+    def __init__(self, frame, filename, info):
+        self.frame = frame
+        self.filename = filename
+        self.info = info  # whatever the capture loop wants the render/on_saved callbacks to see
+        self.seq = None
+        self.data = None
+        self.error = None  # why rendering or encoding failed, if it did
+
+
+class CapturePipeline:
+    """
+    Renders, encodes and writes captured frames on background threads.
+
+    render(job) draws the overlay onto job.frame (on a worker thread).
+    on_saved(job) is called from the writer thread, in capture order, once
+    job.filename is on disk. Pass write(job) to store job.data somewhere other
+    than job.filename (e.g. a frame store). Pass a StageTimings as timings to
+    record how long the overlay, encode and write stages take.
+    """
+
+    def __init__(self, render, on_saved=None, encode_workers=2, queue_size=8,
+                 drop_policy="drop_oldest", jpeg_quality=95, write=None, timings=NULL_TIMINGS):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.render = render
+        self.on_saved = on_saved
+        self.write = write
+        self.timings = timings
+        self.drop_policy = drop_policy
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+
+        self._render_queue = queue.Queue(maxsize=queue_size)
+        self._write_queue = queue.Queue(maxsize=queue_size)
+        self._seq_lock = threading.Lock()
+        self._next_seq = 0
+        self._workers = [
+            threading.Thread(target=self._render_loop, name=f"capture-render-{i}", daemon=True)
+            for i in range(encode_workers)
+        ]
+        self._writer = threading.Thread(target=self._write_loop, name="capture-writer", daemon=True)
+        for thread in self._workers + [self._writer]:
+            thread.start()
+
+    # --- Reader side ---
+    def submit(self, frame, filename, **info):
+        """Hands a frame to the pipeline. Returns False if a frame had to be dropped."""
+        job = CaptureJob(frame, filename, info)
+        self.submitted += 1
+        if self.drop_policy == "block":
+            self._render_queue.put(job)
+            return True
+        try:
+            self._render_queue.put_nowait(job)
+            return True
+        except queue.Full:
+            pass
+
+        self.dropped += 1
+        if self.drop_policy == "drop_newest":
+            print(f"⚠️ Storage can't keep up, dropped {filename} ({self.dropped} dropped so far).")
+            return False
+        try:
+            oldest = self._render_queue.get_nowait()
+            print(f"⚠️ Storage can't keep up, dropped {oldest.filename} ({self.dropped} dropped so far).")
+        except queue.Empty:
+            pass
+        self._render_queue.put(job)
+        return False
+
+    def close(self):
+        """Finishes every queued frame, then stops the worker and writer threads (gives up after CLOSE_TIMEOUT_S)."""
+        try:
+            for _ in self._workers:
+                self._render_queue.put(_STOP, timeout=CLOSE_TIMEOUT_S)
+            for thread in self._workers:
+                thread.join(timeout=CLOSE_TIMEOUT_S)
+            self._write_queue.put(_STOP, timeout=CLOSE_TIMEOUT_S)
+            self._writer.join(timeout=CLOSE_TIMEOUT_S)
+        except queue.Full:
+            pass
+        if self._writer.is_alive():
+            print(f"⚠️ The pipeline still hadn't saved every photo after {CLOSE_TIMEOUT_S}s; the last ones may be missing.")
+
+    def summary(self):
+        return (f"Pipeline: {self.submitted} frames submitted, {self.written} written, "
+                f"{self.dropped} dropped, {self.write_errors} write errors.")
+
+    # --- Background threads ---
+    def _render_loop(self):
+        while True:
+            # Taking a job and numbering it happen together, so sequence
+            # numbers follow the order the frames were captured in
+            with self._seq_lock:
+                job = self._render_queue.get()
+                if job is _STOP:
+                    return
+                job.seq = self._next_seq
+                self._next_seq += 1
+            try:
+                with self.timings.stage("overlay"):
+                    self.render(job)
+                with self.timings.stage("encode"):
+                    ok, encoded = cv2.imencode(".jpg", job.frame, self.encode_params)
+                    job.data = encoded.tobytes() if ok else None
+            except Exception as e:
+                # Still handed on, so the writer's capture order isn't held up; it reports the error
+                job.data, job.error = None, e
+            self._write_queue.put(job)
+
+    def _write_loop(self):
+        # Workers can finish out of order; hold early frames back until their turn
+        waiting = {}
+        next_seq = 0
+        while True:
+            job = self._write_queue.get()
+            if job is _STOP:
+                break
+            waiting[job.seq] = job
+            while next_seq in waiting:
+                self._write(waiting.pop(next_seq))
+                next_seq += 1
+        for seq in sorted(waiting):
+            self._write(waiting[seq])
+
+    def _write(self, job):
+        try:
+            if job.data is None:
+                raise IOError(job.error or "JPEG encoding failed")
+            with self.timings.stage("write"):
+                if self.write:
+                    self.write(job)
+                else:
+                    with open(job.filename, "wb") as f:
+                        f.write(job.data)
+        except Exception as e:
+            self.write_errors += 1
+            print(f"❌ Could not save '{job.filename}'. Error: {e}")
+            return
+        self.written += 1
+        if self.on_saved:
+            try:
+                self.on_saved(job)
+            except Exception as e:
+                # The photo is on disk, but whatever on_saved records for it isn't
+                self.write_errors += 1
+                print(f"❌ Saved '{job.filename}', but recording it failed. Error: {e}")
@@ -0,0 +1,150 @@
+# One image of evenly spaced frames from a sit: proof at a glance, no GIF needed.
+#
+# A contact sheet needs each photo at thumbnail size only, so nothing is ever
+# decoded at full resolution:
+#
+#   - each JPEG is decoded with libjpeg's DCT-domain scaling (Image.draft) at
+#     the smallest 1/2, 1/4 or 1/8 scale that still covers the tile, then
+#     shrunk the rest of the way by cv2.resize writing straight into the tile
+#   - tiles are decoded by a pool of threads (Pillow lets go of the GIL while
+#     it decodes and resizes) and each is copied straight into its place in one
+#     preallocated NumPy canvas, so memory is the canvas plus one small image
+#     per thread, however many frames the sheet has
+#   - each tile gets a bar with the minutes into the sit and the capture time
+#     (from the frame manifest), drawn with the overlay compositor, since
+#     the stamp burned into the photo is unreadable at thumbnail size
+#
+# Compare against decoding the photos at full size with: python contact_sheet.py
+#
+# Required libraries: Pillow, NumPy, opencv-python
+
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import math
+import numpy as np
+import os
+import time
+
+from exposure_lut import apply_exposure
+from frame_loader import open_image, default_workers
+from overlay import OverlayCompositor
+
+TILE_WIDTH = 240
+GAP = 4                        # Pixels between tiles and around the edge
+BACKGROUND = (16, 16, 16)
+LABEL_COLOR = (255, 255, 255)
+LABEL_BG_COLOR = (0, 0, 0)
+
+_compositor = OverlayCompositor()
+
+
+def grid(count, tile_size):
+    """(columns, rows) for `count` tiles of `tile_size`, making the sheet roughly 4:3."""
+    tile_width, tile_height = tile_size
+    columns = max(1, round(math.sqrt(count * tile_height * 4 / (tile_width * 3))))
+    columns = min(columns, count)
+    return columns, math.ceil(count / columns)
+
+
+def label_text(row):
+    """'12 mins - 09:31:05' for a manifest row, like the stamp main.py puts on the photo."""
+    elapsed_minutes = int(row["elapsed"]) // 60
+    minutes_text = f"{elapsed_minutes} min" if elapsed_minutes == 1 else f"{elapsed_minutes} mins"
+    return f"{minutes_text} - {time.strftime('%H:%M:%S', time.localtime(row['wall']))}"
+
+
+def decode_thumbnail(frame, tile_size, exposure=None):
+    """
+    Decodes a frame (path or frame store pair) at the smallest DCT scale that
+    still covers `tile_size`. Returns an RGB array, at most twice the tile size.
+    """
+    with open_image(frame) as img:
+        img.draft("RGB", tile_size)
+        thumb = img.convert("RGB")
+    return np.asarray(apply_exposure(thumb, exposure))
+
+
+def render_contact_sheet(frames, labels=None, tile_width=TILE_WIDTH, columns=None, workers=None, exposure=None):
+    """
+    Tiles `frames` (paths or frame store pairs, in order) into one RGB canvas,
+    returned as a NumPy array. `labels`, if given, are drawn on the tiles.
+    """
+    with open_image(frames[0]) as first:
+        width, height = first.size
+    tile_size = (tile_width, round(height * tile_width / width))
+    if columns:
+        columns, rows = min(columns, len(frames)), math.ceil(len(frames) / columns)
+    else:
+        columns, rows = grid(len(frames), tile_size)
+    tile_width, tile_height = tile_size
+    canvas = np.empty((GAP + rows * (tile_height + GAP), GAP + columns * (tile_width + GAP), 3), dtype=np.uint8)
+    canvas[:] = BACKGROUND
+    font_scale = tile_width / 600
+    padding = max(2, tile_width // 80)
+
+    def place(i):
+        x = GAP + (i % columns) * (tile_width + GAP)
+        y = GAP + (i // columns) * (tile_height + GAP)
+        tile = canvas[y:y + tile_height, x:x + tile_width]
+        thumb = decode_thumbnail(frames[i], tile_size, exposure)
+        if thumb.shape[:2] == (tile_height, tile_width):
+            np.copyto(tile, thumb)
+        else:
+            cv2.resize(thumb, tile_size, dst=tile, interpolation=cv2.INTER_AREA)
+        if labels:
+            _compositor.draw_bar(tile, labels[i], (0, 0), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                                 LABEL_COLOR, LABEL_BG_COLOR, 1, padding)
+
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as executor:
+        # list() re-raises the first error from a worker
+        list(executor.map(place, range(len(frames))))
+    return canvas
+
+
+def save_sheet(canvas, path, quality=85):
+    """Writes the canvas as a JPEG (or PNG, by the file extension)."""
+    image = Image.fromarray(canvas)
+    if os.path.splitext(path)[1].lower() == ".png":
+        image.save(path, optimize=True)
+    else:
+        image.save(path, quality=quality)
+
+
+# --- Benchmark ---
+def benchmark(count=300, width=1920, height=1080):
+    """Renders a sheet of `count` fake photos, against decoding each at full size first."""
+    import shutil
+    import tempfile
+    from fake_camera import FakeVideoCapture
+    folder = tempfile.mkdtemp(prefix="contact_sheet_")
+    try:
+        camera = FakeVideoCapture(width=width, height=height, move_every=5)
+        frames = []
+        for i in range(count):
+            _, frame = camera.read()
+            frames.append(os.path.join(folder, f"frame_{i:04d}.jpg"))
+            cv2.imwrite(frames[-1], frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        labels = [f"{i} mins - 09:{i % 60:02d}:00" for i in range(count)]
+
+        started = time.perf_counter()
+        thumbs = []
+        for path in frames:
+            with Image.open(path) as img:
+                thumbs.append(img.convert("RGB").resize((TILE_WIDTH, TILE_WIDTH * height // width),
+                                                        Image.Resampling.LANCZOS))
+        print(f"Full-size decode: {time.perf_counter() - started:.2f}s for {count} tiles")
+
+        started = time.perf_counter()
+        canvas = render_contact_sheet(frames, labels)
+        rendered = time.perf_counter() - started
+        save_sheet(canvas, os.path.join(folder, "sheet.jpg"))
+        print(f"Contact sheet: {rendered:.2f}s to render, {time.perf_counter() - started:.2f}s with saving, "
+              f"{canvas.shape[1]}x{canvas.shape[0]} ({canvas.nbytes / (1024 * 1024):.1f} MB canvas, "
+              f"{default_workers()} threads)")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark()
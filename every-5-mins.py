@@ -3,10 +3,33 @@ import time
 import os
 import random
 
+from scheduler import CaptureScheduler, ramp
+from frame_source import FrameSource, DutyCycledCamera, mean_brightness
+from overlay import OverlayCompositor
+from manifest import SessionManifest, photo_filename
+from stillness import StillnessMeter, overlay_lines, photo_change_lines
+
 # --- Configuration ---
 CAPTURE_INTERVAL = 300  # 300 seconds = 5 minutes
 OUTPUT_DIR = "timelapse_images"
 CAMERA_INDEX = 0
+# Capture times in seconds from the start: 1 sec, 1 min, 5 mins, then every 5 mins
+FIRST_CAPTURES = [1, 60, 300]
+# If a capture runs past the next deadline: "skip" the missed photo or "catch_up"
+OVERRUN_POLICY = "skip"
+# How to make sure each photo is taken now, not pulled stale from the camera's
+# buffer: "grabber" (background thread), "flush" (drain the buffer) or "none"
+FRESHNESS = "grabber"
+# Power saving: switch the webcam off between photos and turn it back on just
+# early enough to warm up (measured) and let the exposure settle
+POWER_SAVING = True
+# Stillness: each photo is compared with the previous one and the change is
+# stamped on it (also saved in the session's frame manifest), which works with
+# the camera off between photos. MEASURE_STILLNESS also samples the camera about
+# once a second between photos, for how still you were the whole time; it needs
+# the camera on, so turning it on turns POWER_SAVING off.
+MEASURE_STILLNESS = False
+OPTICAL_FLOW = False  # Also measure optical flow (a little more CPU, catches slow drifts)
 
 # --- Text Overlay Settings ---
 FONT = cv2.FONT_HERSHEY_SIMPLEX
@@ -26,76 +49,79 @@ START_Y = 40          # Y-position for the TOP of the first bar
 LINE_GAP = 10         # The visible gap between each black bar
 
 # --- Helper Function (Revised for Centring) ---
+OVERLAY = OverlayCompositor()
+
 def draw_text_with_bg(frame, text, top_left_position, font, scale, text_color, bg_color, thickness):
     """Draws text with a background bar, properly centred on the Y-axis."""
-    x, y = top_left_position
-    (text_width, text_height), baseline = cv2.getTextSize(text, font, scale, thickness)
-
-    # Calculate bar size and draw it
-    bar_end = (x + text_width + PADDING * 2, y + text_height + baseline + PADDING * 2)
-    cv2.rectangle(frame, (x, y), bar_end, bg_color, -1)
+    # New text (the timestamp) is drawn straight onto the frame with putText;
+    # a line drawn again (the Samsara line) is copied from a cached sprite.
+    # Returns the total height of the bar just drawn.
+    return OVERLAY.draw_bar(frame, text, top_left_position, font, scale, text_color, bg_color, thickness, PADDING)
 
-    # **FIXED**: Calculate text position to be vertically centred inside the bar.
-    text_baseline_y = y + text_height + PADDING + (baseline // 2)
-    text_position = (x + PADDING, text_baseline_y)
-    cv2.putText(frame, text, text_position, font, scale, text_color, thickness)
-
-    # Return the total height of the bar just drawn
-    return bar_end[1] - y
+def elapsed_label(offset_seconds):
+    """Turns a scheduled capture time into the label stamped on the photo."""
+    if offset_seconds < 60: return f"{int(offset_seconds)} sec"
+    if offset_seconds < 120: return "1 min"
+    return f"{int(offset_seconds // 60)} mins"
 
 # --- Setup ---
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
     print(f"Created directory: {OUTPUT_DIR}")
 
-cap = cv2.VideoCapture(CAMERA_INDEX)
+power_saving = POWER_SAVING and not MEASURE_STILLNESS
+if POWER_SAVING and MEASURE_STILLNESS:
+    print("⚠️ MEASURE_STILLNESS keeps the camera on between photos, so POWER_SAVING is off for this session.")
+if power_saving:
+    cap = DutyCycledCamera(CAMERA_INDEX, freshness=FRESHNESS)
+else:
+    cap = FrameSource(CAMERA_INDEX, freshness=FRESHNESS)
 if not cap.isOpened():
     raise IOError(f"Cannot open webcam with index {CAMERA_INDEX}")
 
 # --- Pre-Loop Setup ---
 samsara_cycles_this_session = random.randint(999999, 99999999)
+meter = StillnessMeter(optical_flow=OPTICAL_FLOW)
+# One row per photo, so gif-maker.py can find this session's frames
+manifest = SessionManifest(OUTPUT_DIR)
 print("Starting time-lapse. Press Ctrl+C to stop.")
 image_count = 0
+# Deadlines are measured from here on the monotonic clock, so they never drift
+scheduler = CaptureScheduler(ramp(FIRST_CAPTURES, CAPTURE_INTERVAL), overrun=OVERRUN_POLICY)
 
 # --- Main Loop ---
 try:
     while True:
-        # --- DYNAMIC WAIT LOGIC ---
-        if image_count == 0:
-            wait_time_seconds = 1
-            print("Waiting for 1 second to take the first photo...")
-        elif image_count == 1:
-            wait_time_seconds = 59
-            print("Waiting for 59 seconds for the next photo (at the 1-minute mark)...")
-        elif image_count == 2:
-            wait_time_seconds = 240
-            print("Waiting for 4 minutes for the next photo (at the 5-minute mark)...")
-        else:
-            wait_time_seconds = CAPTURE_INTERVAL
-            print(f"Waiting for 5 minutes until the next capture...")
-
-        time.sleep(wait_time_seconds)
+        # --- WAIT FOR THE NEXT DEADLINE ---
+        if not scheduler.retrying:
+            print(f"Waiting {max(0, scheduler.seconds_until_next()):.0f} seconds for the next photo "
+                  f"(at the {elapsed_label(scheduler.next_offset)} mark)...")
+        if power_saving:
+            cap.idle_for(scheduler.seconds_until_next())
+        if MEASURE_STILLNESS:
+            meter.watch(cap, scheduler.seconds_until_next)
+        tick = scheduler.wait()
         
         # --- CAPTURE AND PROCESS IMAGE ---
         ret, frame = cap.read()
         if ret:
             image_count += 1
+            luminance = mean_brightness(frame)
+            # Before the overlay goes on, so the text doesn't count as movement
+            meter.sample(frame)
+            stillness = meter.interval()
             
             # 1. Generate all text strings
-            if image_count == 1: elapsed_text = "1 sec"
-            elif image_count == 2: elapsed_text = "1 min"
-            else: elapsed_text = f"{5 * (image_count - 2)} mins"
+            elapsed_text = elapsed_label(tick.offset)
 
             text_lines = [
                 (elapsed_text, PRIMARY_FONT_SCALE, PRIMARY_FONT_THICKNESS),
-                (time.strftime("%Y-%m-%d %H:%M:%S"), PRIMARY_FONT_SCALE, PRIMARY_FONT_THICKNESS),
-                (f"Samsara Cycles Left: {samsara_cycles_this_session}", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS),
-                (f"Concentration: {int(random.triangular(0, 100, 15))}%", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS),
-                (f"Dukkha (Stress): {random.randint(20, 80)}%", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS),
-                (f"Moha (Delusion): {random.randint(40, 95)}%", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS),
-                (f"Tanha (Grasping): {random.randint(10, 70)}%", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS),
-                (f"Dosa (Aversion): {random.randint(10, 70)}%", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS)
+                (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cap.captured_wall)), PRIMARY_FONT_SCALE, PRIMARY_FONT_THICKNESS),
+                (f"Samsara Cycles Left: {samsara_cycles_this_session}", JOKE_FONT_SCALE, JOKE_FONT_THICKNESS)
             ]
+            # Measured, not made up
+            still_lines = overlay_lines(stillness) if MEASURE_STILLNESS else photo_change_lines(stillness)
+            text_lines += [(line, JOKE_FONT_SCALE, JOKE_FONT_THICKNESS) for line in still_lines]
 
             # 2. Draw text lines procedurally
             current_y = START_Y
@@ -104,13 +130,28 @@ try:
                 current_y += bar_height + LINE_GAP
             
             # 3. Save the modified frame
-            filename = os.path.join(OUTPUT_DIR, f"image_{time.strftime('%Y%m%d-%H%M%S')}.jpg")
+            filename = photo_filename(OUTPUT_DIR, cap.captured_wall)
             cv2.imwrite(filename, frame)
-            print(f"[{image_count}] Captured {filename} at approx. {elapsed_text}.")
+            manifest.append(
+                file=os.path.basename(filename),
+                wall=cap.captured_wall,
+                monotonic=cap.captured_at,
+                elapsed=cap.captured_at - scheduler.start,
+                size=os.path.getsize(filename),
+                luminance=round(luminance, 2),
+                latency=cap.latency,
+                **stillness
+            )
+            if MEASURE_STILLNESS:
+                still_text = f", stillness {stillness['stillness']}%" if stillness['stillness'] is not None else ""
+            else:
+                still_text = f", change {stillness['motion']:.1f}" if stillness['motion'] is not None else ""
+            print(f"[{image_count}] Captured {filename} at {elapsed_text} ({tick.jitter * 1000:+.0f} ms{still_text}).")
             
         else:
             print("Failed to capture frame. Retrying in 5 seconds...")
             time.sleep(5)
+            scheduler.retry()
 
 except KeyboardInterrupt:
     print("\nStopping time-lapse capture.")
@@ -118,4 +159,9 @@ except KeyboardInterrupt:
 finally:
     cap.release()
     cv2.destroyAllWindows()
+    manifest.close()
+    print(f"Frame manifest: {manifest.rows} frames in {manifest.path}")
+    print(scheduler.summary())
+    print(cap.summary())
+    print(meter.summary())
     print("Webcam released. Exiting.")
\ No newline at end of file
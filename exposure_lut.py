@@ -0,0 +1,65 @@
+# Exposure correction as a 256-entry lookup table.
+#
+# Brightening a frame by a factor is the same as mapping every channel value v
+# to min(255, int(v * factor)), so we build that mapping once as a table and let
+# Pillow apply it to the whole image in C (Image.point). This replaces the
+# exposure.py round-trip of decoding, brightening and re-saving every JPG
+# before gif-maker decodes them all again.
+#
+# "auto" picks a gain per frame from its luminance histogram: enough to lift
+# the median brightness to AUTO_TARGET_MEDIAN, but not so much that the
+# brightest part of the frame is blown out.
+#
+# Required libraries: Pillow, NumPy
+
+import numpy as np
+
+AUTO_TARGET_MEDIAN = 110      # Median brightness (0-255) auto mode aims for
+AUTO_MAX_GAIN = 4.0           # Never brighten more than this
+AUTO_HIGHLIGHT_PERCENTILE = 0.995  # This share of pixels must stay below 255
+
+_tables = {}
+
+
+def gain_table(gain):
+    """The 256-entry table mapping each channel value to value * gain (clipped)."""
+    key = round(gain, 3)
+    table = _tables.get(key)
+    if table is None:
+        # Truncated in single precision, as Pillow's blend does, so the values
+        # match ImageEnhance.Brightness exactly
+        values = np.arange(256, dtype=np.float32) * np.float32(key)
+        table = np.clip(np.floor(values), 0, 255).astype(np.uint8).tolist()
+        _tables[key] = table
+    return table
+
+
+def auto_gain(histogram):
+    """Works out a brightening gain from a 256-bin luminance histogram."""
+    counts = np.asarray(histogram[:256], dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return 1.0
+    cumulative = np.cumsum(counts) / total
+    median = max(int(np.searchsorted(cumulative, 0.5)), 1)
+    highlight = max(int(np.searchsorted(cumulative, AUTO_HIGHLIGHT_PERCENTILE)), 1)
+    gain = min(AUTO_TARGET_MEDIAN / median, 255.0 / highlight, AUTO_MAX_GAIN)
+    return max(gain, 1.0)
+
+
+def apply_exposure(img, exposure):
+    """
+    Brightens an RGB or L image.
+
+    `exposure` is None (leave as is), a factor like 1.5 (same as
+    ImageEnhance.Brightness(img).enhance(1.5)), or "auto".
+    """
+    if exposure is None:
+        return img
+    if exposure == "auto":
+        gain = auto_gain(img.convert("L").histogram())
+    else:
+        gain = float(exposure)
+    if abs(gain - 1.0) < 1e-3:
+        return img
+    return img.point(gain_table(gain) * len(img.getbands()))
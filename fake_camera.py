@@ -0,0 +1,103 @@
+# A stand-in for cv2.VideoCapture that makes up frames, for running and timing
+# the capture code on machines without a webcam (laptops with the lid shut, CI).
+#
+# Frames look roughly like a sit: a still background and a seated figure,
+# with sensor noise on top and, if asked, the head shifting every few frames.
+# A handful of noise patterns is made up front and cycled, so producing a
+# frame is just a copy, like retrieving one from a real driver.
+#
+# Usage:
+#   cap = FakeVideoCapture(width=1280, height=720, noise=3.0)
+#   source = FrameSource(capture=cap)
+#
+# Required libraries: opencv-python, NumPy
+
+import cv2
+import numpy as np
+import time
+
+NOISE_VARIANTS = 8  # Different noise patterns cycled through
+
+
+class FakeVideoCapture:
+    """
+    Synthetic frames behind the cv2.VideoCapture API (isOpened, grab, retrieve,
+    read, get, set, release).
+
+    fps paces grab() like a real camera (None = as fast as possible). noise is
+    the standard deviation of the sensor noise (0-255). move_every shifts the
+    head every that many frames (None = perfectly still sitter).
+    """
+
+    def __init__(self, index=0, width=1280, height=720, fps=30.0, noise=3.0, move_every=None, seed=0):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.move_every = move_every
+        self.frames_grabbed = 0
+        self._opened = True
+        self._next_frame_at = time.monotonic()
+
+        rng = np.random.default_rng(seed)
+        scene = self._scene(width, height)
+        self._variants = []
+        for _ in range(NOISE_VARIANTS):
+            noisy = scene + rng.normal(0.0, noise, scene.shape) if noise else scene
+            self._variants.append(np.clip(noisy, 0, 255).astype(np.uint8))
+
+    @staticmethod
+    def _scene(width, height):
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+        scene = np.dstack([40 + 120 * xs / width, 60 + 100 * ys / height, 80 + 40 * np.sin(xs / 90)])
+        # Body and head of the sitter
+        cv2.ellipse(scene, (width // 2, int(height * 0.65)), (width // 7, int(height * 0.35)), 0, 0, 360,
+                    (60, 90, 150), -1)
+        return cv2.GaussianBlur(scene, (0, 0), 3)
+
+    # --- cv2.VideoCapture API ---
+    def isOpened(self):
+        return self._opened
+
+    def grab(self):
+        if not self._opened:
+            return False
+        if self.fps:
+            # Wait for the next frame like a real camera would
+            wait = self._next_frame_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._next_frame_at = max(self._next_frame_at, time.monotonic()) + 1.0 / self.fps
+        self.frames_grabbed += 1
+        return True
+
+    def retrieve(self, image=None, flag=0):
+        if not self._opened or self.frames_grabbed == 0:
+            return False, None
+        variant = self._variants[self.frames_grabbed % NOISE_VARIANTS]
+        if image is None or image.shape != variant.shape:
+            image = np.empty_like(variant)
+        np.copyto(image, variant)
+        # The head moves a little every move_every frames
+        step = self.frames_grabbed // self.move_every if self.move_every else 0
+        head = (self.width // 2 + (step % 5 - 2) * self.width // 100, int(self.height * 0.25))
+        cv2.circle(image, head, self.height // 9, (90, 120, 180), -1)
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop_id):
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: float(self.width),
+            cv2.CAP_PROP_FRAME_HEIGHT: float(self.height),
+            cv2.CAP_PROP_FPS: float(self.fps or 0),
+        }.get(prop_id, 0.0)
+
+    def set(self, prop_id, value):
+        return False
+
+    def release(self):
+        self._opened = False
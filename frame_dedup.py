@@ -0,0 +1,80 @@
+# Collapses runs of near-identical frames into one longer-showing frame.
+#
+# During a sit, most photos look the same: same person, same pose, only the
+# overlay digits change. Each frame is shrunk to a small grayscale thumbnail
+# (with the overlay area blanked out) and compared with the frame that started
+# the current run. If only a handful of thumbnail pixels changed noticeably,
+# the frame is dropped and the run's first frame is shown for longer instead,
+# so the GIF's size and encode time follow how much the sitter actually moved.
+#
+# Required libraries: Pillow, NumPy
+
+from PIL import Image
+import numpy as np
+
+# Width of the grayscale thumbnails frames are compared on
+THUMBNAIL_WIDTH = 96
+# A thumbnail pixel has "changed" if it moved by more than this (0-255).
+# Shrinking averages the camera noise away, so this can be small.
+PIXEL_TOLERANCE = 8
+
+
+def thumbnail(img, ignore_region=None):
+    """
+    A small grayscale copy of `img` as a NumPy array for difference scoring.
+
+    `ignore_region` is a (left, top, right, bottom) box in fractions of the
+    frame (e.g. the overlay bars) that is blanked out so it never counts.
+    """
+    width, height = img.size
+    size = (THUMBNAIL_WIDTH, max(1, round(height * THUMBNAIL_WIDTH / width)))
+    thumb = np.asarray(img.convert("L").resize(size, Image.Resampling.BOX), dtype=np.int16)
+    if ignore_region is not None:
+        thumb = thumb.copy()
+        left, top, right, bottom = ignore_region
+        thumb[round(top * size[1]):round(bottom * size[1]), round(left * size[0]):round(right * size[0])] = 0
+    return thumb
+
+
+def difference_score(a, b):
+    """Share of thumbnail pixels (0.0 - 1.0) that changed by more than PIXEL_TOLERANCE."""
+    return float(np.count_nonzero(np.abs(a - b) > PIXEL_TOLERANCE)) / a.size
+
+
+class NearDuplicateFilter:
+    """
+    Merges runs of near-identical frames.
+
+    collapse(frames, duration) takes frames that are each shown for `duration`
+    ms and yields (frame, duration) pairs where every run of near-duplicates
+    has become its first frame, shown for the whole run.
+    """
+
+    def __init__(self, threshold=0.005, ignore_region=None):
+        self.threshold = threshold
+        self.ignore_region = ignore_region
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def collapse(self, frames, duration):
+        kept = None
+        kept_thumb = None
+        kept_duration = 0
+        for frame in frames:
+            self.frames_in += 1
+            thumb = thumbnail(frame, self.ignore_region)
+            # Compare with the run's first frame, not the previous one, so slow
+            # drift (a slouch, the light changing) still starts a new frame
+            if kept is not None and difference_score(kept_thumb, thumb) <= self.threshold:
+                kept_duration += duration
+                continue
+            if kept is not None:
+                self.frames_out += 1
+                yield kept, kept_duration
+            kept, kept_thumb, kept_duration = frame, thumb, duration
+        if kept is not None:
+            self.frames_out += 1
+            yield kept, kept_duration
+
+    def summary(self):
+        return f"Near-duplicates: {self.frames_in} frames collapsed to {self.frames_out}."
@@ -0,0 +1,113 @@
+# Fast, parallel loading of timelapse frames for the GIF makers.
+#
+# Webcam JPEGs are much bigger than the 960px frames we put in a GIF, so each
+# frame is decoded with libjpeg's DCT-domain scaling (Image.draft) to roughly
+# the target size first, then finished off with a high-quality LANCZOS resize.
+# Frames are decoded in a pool of worker processes (one per CPU core) and
+# handed back in their original order. Exposure correction, if asked for, is
+# applied in the same pass, so each photo is decoded exactly once.
+#
+# A frame is either a JPG path or a (store path, index) pair for sessions kept
+# in a frame store (see frame_store.py); workers map each store once and read
+# frames straight out of it.
+#
+# Pass a FrameCache (see frame_cache.py) to reuse frames decoded by earlier
+# runs: the parent looks each frame up and workers only decode the misses.
+#
+# Required libraries: Pillow, NumPy
+
+from PIL import Image
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+
+from exposure_lut import apply_exposure
+import frame_cache
+from frame_store import read_frame_bytes
+
+# How many frames each worker may have decoded ahead of the GIF writer.
+# Keeps memory bounded when encoding is slower than decoding.
+FRAMES_IN_FLIGHT_PER_WORKER = 4
+
+
+def target_size(size, width):
+    """Returns (width, height) for resizing `size` to `width`, keeping the aspect ratio."""
+    aspect_ratio = float(size[1]) / float(size[0])
+    return width, int(aspect_ratio * width)
+
+
+def open_image(frame):
+    """Opens a frame given as a file path or a (store path, index) pair."""
+    if isinstance(frame, tuple):
+        return Image.open(io.BytesIO(read_frame_bytes(*frame)))
+    return Image.open(frame)
+
+
+def frame_name(frame):
+    """A short name for a frame, for messages."""
+    if isinstance(frame, tuple):
+        return f"{os.path.basename(frame[0])}#{frame[1]}"
+    return frame
+
+
+def load_frame(path, width, exposure=None, cache_path=None):
+    """
+    Opens a frame and resizes it to `width` pixels wide (None keeps the original size).
+
+    `exposure` brightens the result: None, a factor like 1.5, or "auto".
+    `cache_path` is the frame's FrameCache entry: read if it exists, filled if not.
+    """
+    if cache_path:
+        cached = frame_cache.load(cache_path)
+        if cached is not None:
+            return cached
+    with open_image(path) as img:
+        if width is None:
+            frame = img.convert("RGB")
+        else:
+            new_size = target_size(img.size, width)
+            # Let libjpeg decode at the smallest 1/2, 1/4 or 1/8 scale that is
+            # still at least as big as the target. Does nothing for non-JPEGs.
+            img.draft("RGB", new_size)
+            frame = img.convert("RGB").resize(new_size, Image.Resampling.LANCZOS)
+    # Brighten after shrinking: same result, far fewer pixels
+    frame = apply_exposure(frame, exposure)
+    if cache_path:
+        frame_cache.save(cache_path, frame)
+    return frame
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def iter_frames(paths, width, workers=None, exposure=None, cache=None):
+    """
+    Yields the resized frames for `paths`, in order.
+
+    Decoding runs in a process pool sized to the machine. Only a few frames per
+    worker are decoded ahead of the consumer, so this can feed a streaming GIF
+    writer without holding the whole session in memory. With a FrameCache as
+    `cache`, frames preprocessed by an earlier run are loaded instead of decoded.
+    """
+    if workers is None:
+        workers = default_workers()
+
+    def entry(path):
+        return cache.entry_path(path, width, exposure) if cache else None
+
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield load_frame(path, width, exposure, entry(path))
+        return
+
+    max_in_flight = workers * FRAMES_IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(load_frame, path, width, exposure, entry(path)))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,181 @@
+# High-rate capture (several frames a second) into a preallocated ring buffer.
+#
+# At 5-15 fps, allocating a fresh frame, drawing the overlay and encoding a JPG
+# for every photo is more than the capture loop can afford. Instead:
+#
+#   - a fixed number of frame-sized NumPy arrays is allocated once, up front
+#   - the camera decodes each frame straight into a free slot (cap.read(image=...)),
+#     so capturing allocates no new frame memory at all
+#   - a background thread takes the captured slots in batches, draws the
+#     overlay, JPEG-encodes and writes them, then hands the slots back
+#
+# If the flusher falls so far behind that every slot is full, new frames are
+# dropped (and counted) rather than overwriting frames not yet on disk.
+#
+# Required libraries: opencv-python, NumPy
+
+import cv2
+import numpy as np
+import threading
+import time
+from collections import deque
+
+from stage_timing import NULL_TIMINGS
+
+# Write frames once this many are waiting (or FLUSH_INTERVAL_S has passed)
+FLUSH_BATCH = 8
+FLUSH_INTERVAL_S = 0.5
+
+
+class RingSlot:
+    """One preallocated frame buffer plus what the capture loop knows about its frame."""
+
+    def __init__(self, index, frame):
+        self.index = index
+        self.frame = frame
+        self.filename = None
+        self.info = None
+        self.data = None
+
+
+class RingRecorder:
+    """
+    Captures frames into preallocated slots and saves them in batches.
+
+    Capture loop:
+        slot = recorder.reserve()          # None if every slot is still waiting to be saved
+        ret, frame = cap.read(image=slot.frame)
+        recorder.commit(slot, frame, filename, **info)   # or recorder.cancel(slot)
+
+    render(slot) draws the overlay onto slot.frame and on_saved(slot) is called
+    once slot.filename is on disk, both on the flusher thread, in capture order.
+    write(slot), if given, stores slot.data instead of writing slot.filename.
+    timings, if given, records the overlay, encode and write stages.
+    """
+
+    def __init__(self, frame_shape, render, on_saved=None, capacity=32, batch_size=FLUSH_BATCH,
+                 jpeg_quality=95, write=None, timings=NULL_TIMINGS):
+        self.render = render
+        self.on_saved = on_saved
+        self.write = write
+        self.timings = timings
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.slots = [RingSlot(i, np.empty(frame_shape, dtype=np.uint8)) for i in range(capacity)]
+        self.committed = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self.reallocations = 0
+        self.high_water = 0
+        self.first_commit = None
+        self.last_commit = None
+
+        self._free = deque(self.slots)
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closing = False
+        self._thread = threading.Thread(target=self._flush_loop, name="ring-flusher", daemon=True)
+        self._thread.start()
+
+    # --- Capture side ---
+    def reserve(self):
+        """Returns a free slot to capture into, or None (a dropped frame) if all are in use."""
+        with self._lock:
+            if not self._free:
+                self.dropped += 1
+                return None
+            return self._free.popleft()
+
+    def commit(self, slot, frame, filename, **info):
+        """Queues a captured frame for saving. `frame` is what cap.read(image=slot.frame) returned."""
+        if frame is not slot.frame:
+            # OpenCV had to allocate (the camera size didn't match the slot); keep its array from now on
+            slot.frame = frame
+            self.reallocations += 1
+        slot.filename = filename
+        slot.info = info
+        now = time.monotonic()
+        with self._wake:
+            self._ready.append(slot)
+            self.committed += 1
+            self.high_water = max(self.high_water, len(self._ready))
+            if self.first_commit is None:
+                self.first_commit = now
+            self.last_commit = now
+            if len(self._ready) >= self.batch_size:
+                self._wake.notify()
+
+    def cancel(self, slot):
+        """Gives back a reserved slot whose capture failed."""
+        with self._lock:
+            self._free.appendleft(slot)
+
+    def close(self):
+        """Saves every frame still in the ring, then stops the flusher."""
+        with self._wake:
+            self._closing = True
+            self._wake.notify()
+        self._thread.join()
+
+    # --- Reporting ---
+    def summary(self):
+        fps = 0.0
+        if self.committed > 1 and self.last_commit > self.first_commit:
+            fps = (self.committed - 1) / (self.last_commit - self.first_commit)
+        return (f"High-rate capture: {self.committed} frames at {fps:.1f} fps sustained, "
+                f"{self.dropped} dropped, {self.written} written, {self.write_errors} write errors, "
+                f"ring peak {self.high_water}/{self.capacity}, {self.reallocations} reallocations.")
+
+    # --- Flusher thread ---
+    def _flush_loop(self):
+        while True:
+            with self._wake:
+                self._wake.wait_for(lambda: len(self._ready) >= self.batch_size or self._closing,
+                                    timeout=FLUSH_INTERVAL_S)
+                batch = [self._ready.popleft() for _ in range(min(len(self._ready), self.batch_size))]
+                finished = self._closing and not self._ready and not batch
+            if finished:
+                return
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        errors = {}
+        for slot in batch:
+            try:
+                with self.timings.stage("overlay"):
+                    self.render(slot)
+                with self.timings.stage("encode"):
+                    ok, encoded = cv2.imencode(".jpg", slot.frame, self.encode_params)
+                    slot.data = encoded.tobytes() if ok else None
+            except Exception as e:
+                slot.data, errors[slot.index] = None, e
+        for slot in batch:
+            try:
+                if slot.data is None:
+                    raise IOError(errors.get(slot.index) or "JPEG encoding failed")
+                with self.timings.stage("write"):
+                    if self.write:
+                        self.write(slot)
+                    else:
+                        with open(slot.filename, "wb") as f:
+                            f.write(slot.data)
+            except Exception as e:
+                self.write_errors += 1
+                print(f"❌ Could not save '{slot.filename}'. Error: {e}")
+                continue
+            self.written += 1
+            if self.on_saved:
+                try:
+                    self.on_saved(slot)
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f"❌ Saved '{slot.filename}', but recording it failed. Error: {e}")
+        # Only now can the camera reuse the buffers
+        for slot in batch:
+            slot.data = None
+        with self._lock:
+            self._free.extend(batch)
@@ -0,0 +1,379 @@
+# A webcam wrapper that always hands back a frame taken *now*, not minutes ago.
+#
+# cv2.VideoCapture keeps a small queue of frames in the driver (V4L2 usually
+# holds 4). After sleeping for 5 minutes between photos, the first read()
+# returns whatever has been sitting in that queue, so the timestamp stamped
+# on the photo is wrong. FrameSource fixes that with one of two policies:
+#
+#   "grabber" - a background thread keeps calling grab(), so the driver queue
+#               never fills up. read() waits for the first grab() that started
+#               after it was called and only decodes that frame.
+#   "flush"   - no thread. read() grab()s and throws away the queued frames
+#               until grab() has to wait for the camera, then decodes the next.
+#   "none"    - plain cap.read(), the old behaviour.
+#
+# Either way, read() records when the frame was captured (monotonic and wall
+# clock) and how long after the request it arrived.
+#
+# Required library: opencv-python
+
+import cv2
+import threading
+import time
+
+FRESHNESS_POLICIES = ("grabber", "flush", "none")
+
+# In flush mode, a grab() that takes longer than this had to wait for the
+# camera, which means the driver queue is empty and the frame is fresh
+FLUSH_WAIT_THRESHOLD_S = 0.010
+# Never flush more than this many frames (in case the camera never blocks)
+MAX_FLUSH_FRAMES = 10
+# In grabber mode, give up waiting for a new frame after this long
+GRABBER_TIMEOUT_S = 2.0
+
+
+class FrameSource:
+    """
+    A drop-in for cv2.VideoCapture (isOpened/read/release) with fresh frames.
+
+    After each successful read(), `captured_at` (monotonic), `captured_wall`
+    (time.time()) and `latency` (seconds from the read() call to the capture
+    instant) describe the frame that was returned.
+    """
+
+    def __init__(self, camera_index=0, freshness="grabber", capture=None):
+        if freshness not in FRESHNESS_POLICIES:
+            raise ValueError(f"Unknown freshness policy: {freshness}")
+        self.camera_index = camera_index
+        self.freshness = freshness
+        self.cap = capture if capture is not None else cv2.VideoCapture(camera_index)
+        self.captured_at = None
+        self.captured_wall = None
+        self.latency = None
+        self.latencies = []
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._grab_started = None  # frames grabbed after this point are newer than any request before it
+        self._grabbed_at = None
+        self._grabbed_wall = None
+        self._grab_ok = False
+        self._request = None  # monotonic time of a read() waiting for a fresh frame
+        self._reads_done = 0
+        self._running = False
+        self._thread = None
+        if self.freshness == "grabber" and self.cap.isOpened():
+            self._running = True
+            self._thread = threading.Thread(target=self._grab_loop, name="frame-grabber", daemon=True)
+            self._thread.start()
+
+    # --- cv2.VideoCapture-compatible API ---
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        """Like cap.read(); pass `image` (an array of the frame's size) to decode into it without allocating."""
+        requested_at = time.monotonic()
+        if self.freshness == "grabber":
+            ret, frame = self._read_grabbed(requested_at, image)
+        elif self.freshness == "flush":
+            ret, frame = self._read_flushed(image)
+        else:
+            ret, frame = self.cap.read(image)
+            self._stamp(time.monotonic(), time.time())
+
+        if ret:
+            self.latency = self.captured_at - requested_at
+            self.latencies.append(self.latency)
+        return ret, frame
+
+    def release(self):
+        if self._thread is not None:
+            with self._new_frame:
+                self._running = False
+                self._new_frame.notify_all()
+            self._thread.join()
+            self._thread = None
+        self.cap.release()
+
+    def set(self, prop_id, value):
+        with self._lock:
+            return self.cap.set(prop_id, value)
+
+    def get(self, prop_id):
+        with self._lock:
+            return self.cap.get(prop_id)
+
+    # --- Reporting ---
+    def summary(self):
+        if not self.latencies:
+            return f"Frame source ({self.freshness}): no frames read."
+        mean_ms = 1000 * sum(self.latencies) / len(self.latencies)
+        max_ms = 1000 * max(self.latencies)
+        return f"Frame source ({self.freshness}): capture latency mean {mean_ms:.1f} ms, max {max_ms:.1f} ms."
+
+    # --- Internals ---
+    def _stamp(self, captured_at, captured_wall):
+        self.captured_at = captured_at
+        self.captured_wall = captured_wall
+
+    def _grab_loop(self):
+        with self._new_frame:
+            while self._running:
+                # Grabbing and retrieving share the lock, so a frame is never
+                # replaced while read() is decoding it
+                started = time.monotonic()
+                ok = self.cap.grab()
+                self._grab_started = started
+                self._grab_ok = ok
+                self._grabbed_at = time.monotonic()
+                self._grabbed_wall = time.time()
+                self._new_frame.notify_all()
+                if self._request is not None and self._grab_started >= self._request:
+                    # Let the waiting read() decode this frame before grabbing the next
+                    reads_done = self._reads_done
+                    self._new_frame.wait_for(lambda: self._reads_done != reads_done or not self._running,
+                                             timeout=GRABBER_TIMEOUT_S)
+                else:
+                    # Briefly let go of the lock so release()/set()/get() can get in
+                    self._new_frame.wait(0.001 if ok else 0.1)
+
+    def _read_grabbed(self, requested_at, image=None):
+        # Set without the lock (the grabber holds it while grab() blocks); the
+        # grabber pauses after its next grab so this read can take the frame
+        self._request = requested_at
+        with self._new_frame:
+            try:
+                fresh = self._new_frame.wait_for(
+                    lambda: self._grab_started is not None and self._grab_started >= requested_at,
+                    timeout=GRABBER_TIMEOUT_S,
+                )
+                if not fresh or not self._grab_ok:
+                    return False, None
+                ret, frame = self.cap.retrieve(image)
+                self._stamp(self._grabbed_at, self._grabbed_wall)
+            finally:
+                self._request = None
+                self._reads_done += 1
+                self._new_frame.notify_all()
+        return ret, frame
+
+    def _read_flushed(self, image=None):
+        for _ in range(MAX_FLUSH_FRAMES):
+            started = time.monotonic()
+            if not self.cap.grab():
+                return False, None
+            if time.monotonic() - started > FLUSH_WAIT_THRESHOLD_S:
+                break
+        self._stamp(time.monotonic(), time.time())
+        return self.cap.retrieve(image)
+
+
+# --- Power saving ---
+# Only switch the camera off if it would stay off for at least this long
+DUTY_CYCLE_MIN_OFF_S = 20.0
+# Reopen this much earlier than the measured warm-up time, just in case
+DUTY_CYCLE_MARGIN_S = 1.0
+# Auto-exposure has settled once mean brightness moves less than this
+# (0-255 scale) between consecutive frames
+SETTLE_TOLERANCE = 1.5
+SETTLE_MIN_FRAMES = 3
+SETTLE_MAX_FRAMES = 45
+
+
+def mean_brightness(frame):
+    """Cheap mean brightness from a sparse grid of pixels."""
+    return float(frame[::16, ::16].mean())
+
+
+def settle_exposure(cap):
+    """Throws away frames until auto-exposure stops changing the brightness. Returns how many were discarded."""
+    discarded = 0
+    previous = None
+    steady = 0
+    while discarded < SETTLE_MAX_FRAMES:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        discarded += 1
+        brightness = mean_brightness(frame)
+        if previous is not None and abs(brightness - previous) < SETTLE_TOLERANCE:
+            steady += 1
+            if steady >= 2 and discarded >= SETTLE_MIN_FRAMES:
+                break
+        else:
+            steady = 0
+        previous = brightness
+    return discarded
+
+
+class DutyCycledCamera:
+    """
+    A FrameSource that switches the webcam off between distant captures.
+
+    Call idle_for(seconds_until_next_capture) before waiting for each capture.
+    If the gap is long enough, the device is released, then reopened early by
+    the measured warm-up time (open + auto-exposure settling), with the
+    settling frames thrown away, so the photo is on time and not dark.
+    """
+
+    def __init__(self, camera_index=0, freshness="grabber", open_capture=cv2.VideoCapture,
+                 sleep=time.sleep):
+        self.camera_index = camera_index
+        self.freshness = freshness
+        self.open_capture = open_capture
+        self.sleep = sleep
+        self.source = None
+        self.warmups = []      # (open seconds, settle seconds, frames discarded) per open
+        self.off_seconds = 0.0
+        self.latencies = []    # capture latency of every photo, across reopens
+        self.created_at = time.monotonic()
+        self._open()
+
+    @property
+    def warmup_estimate(self):
+        """Slowest warm-up seen so far, in seconds."""
+        return max(open_s + settle_s for open_s, settle_s, _ in self.warmups) if self.warmups else 0.0
+
+    # --- cv2.VideoCapture-compatible API ---
+    def isOpened(self):
+        return self.source is not None and self.source.isOpened()
+
+    def read(self, image=None):
+        if self.source is None:
+            self._open()
+            if self.source is None:
+                return False, None
+        ret, frame = self.source.read(image)
+        if ret:
+            self.latencies.append(self.source.latency)
+        return ret, frame
+
+    def release(self):
+        if self.source is not None:
+            self.source.release()
+            self.source = None
+
+    @property
+    def captured_wall(self):
+        return self.source.captured_wall if self.source else None
+
+    @property
+    def captured_at(self):
+        return self.source.captured_at if self.source else None
+
+    @property
+    def latency(self):
+        return self.source.latency if self.source else None
+
+    # --- Duty cycling ---
+    def idle_for(self, seconds):
+        """Switches the camera off for as much of the next `seconds` as is safe."""
+        off_for = seconds - self.warmup_estimate - DUTY_CYCLE_MARGIN_S
+        if off_for < DUTY_CYCLE_MIN_OFF_S:
+            if self.source is None:
+                self._open()
+            return
+
+        self.release()
+        print(f"💤 Camera off for {off_for:.0f}s (warm-up estimate {self.warmup_estimate:.2f}s).")
+        self.sleep(off_for)
+        self.off_seconds += off_for
+        self._open()
+
+    def summary(self):
+        lines = []
+        if self.latencies:
+            mean_ms = 1000 * sum(self.latencies) / len(self.latencies)
+            lines.append(f"Frame source ({self.freshness}): capture latency mean {mean_ms:.1f} ms, "
+                         f"max {1000 * max(self.latencies):.1f} ms.")
+        if self.warmups:
+            totals = [open_s + settle_s for open_s, settle_s, _ in self.warmups]
+            session = max(time.monotonic() - self.created_at, 1e-9)
+            lines.append(f"Camera power: {len(self.warmups)} opens, warm-up mean {sum(totals) / len(totals):.2f}s, "
+                         f"max {max(totals):.2f}s, camera off {100 * self.off_seconds / session:.0f}% of the session.")
+        return "\n".join(lines)
+
+    # --- Internals ---
+    def _open(self):
+        started = time.monotonic()
+        capture = self.open_capture(self.camera_index)
+        opened = time.monotonic()
+        self.source = FrameSource(self.camera_index, self.freshness, capture=capture)
+        if not self.source.isOpened():
+            # Release the dead capture; the next read() tries to open it again
+            self.source.release()
+            self.source = None
+            print(f"❌ Could not reopen webcam with index {self.camera_index}.")
+            return
+
+        discarded = settle_exposure(self.source)
+        settled = time.monotonic()
+
+        open_s, settle_s = opened - started, settled - opened
+        self.warmups.append((open_s, settle_s, discarded))
+        print(f"📷 Camera ready in {open_s + settle_s:.2f}s (open {open_s:.2f}s, "
+              f"exposure settling {settle_s:.2f}s, {discarded} frames discarded).")
+
+
+# --- Background warm-up ---
+class CameraWarmup:
+    """
+    Opens a camera and lets its exposure settle on a background thread, so it
+    is ready by the time the user has answered the setup questions.
+
+        warmup = CameraWarmup(lambda: FrameSource(0))
+        ...prompts...
+        cap = warmup.result()   # waits if needed; raises IOError if the camera failed
+    """
+
+    def __init__(self, open_camera):
+        self.open_camera = open_camera
+        self.cap = None
+        self.error = None
+        self.open_s = None
+        self.settle_s = None
+        self.discarded = 0
+        self._thread = threading.Thread(target=self._warm_up, name="camera-warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def result(self, timeout=None):
+        """The opened, settled camera. Raises IOError (saying what went wrong) if it isn't usable."""
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise IOError(f"it still wasn't ready after {timeout:.0f}s")
+        if self.error is not None:
+            raise self.error
+        return self.cap
+
+    def summary(self):
+        if self.error is not None:
+            return f"Camera warm-up failed: {self.error}"
+        if self.open_s is None:
+            return "Camera warm-up: still running."
+        return (f"Camera warm-up in the background: open {self.open_s:.2f}s, exposure settling "
+                f"{self.settle_s:.2f}s, {self.discarded} frames discarded.")
+
+    def _warm_up(self):
+        started = time.monotonic()
+        try:
+            cap = self.open_camera()
+        except Exception as e:
+            self.error = IOError(f"opening it failed ({e})")
+            return
+        opened = time.monotonic()
+        if not cap.isOpened():
+            cap.release()
+            self.error = IOError("it could not be opened (is it plugged in, or in use by another app?)")
+            return
+        self.discarded = settle_exposure(cap)
+        if self.discarded == 0:
+            cap.release()
+            self.error = IOError("it opened but gave no frames")
+            return
+        self.open_s, self.settle_s = opened - started, time.monotonic() - opened
+        self.cap = cap
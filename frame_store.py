@@ -0,0 +1,218 @@
+# One file per session instead of thousands of JPGs.
+#
+# A long sit at short intervals leaves a folder full of small JPGs, which is
+# slow to list, glob, back up and sync. A frame store keeps a session in two
+# append-only files:
+#
+#   <session>.frames  - the JPG bytes of every photo, one after another
+#   <session>.fidx    - a fixed-width record per photo: offset and length in
+#                       the .frames file, wall-clock time, seconds into the session
+#
+# Readers memory-map both files. Opening a store and fetching frame N cost the
+# same whether it holds ten frames or a hundred thousand: the index is never
+# parsed, just viewed as a NumPy array, and a frame's bytes are a slice of the
+# mapped .frames file (no copy). Time ranges are a binary search on the index.
+#
+# Export frames back to JPGs with:
+#   python frame_store.py export timelapse_images/sessions/<session>.frames [--start-minute M] [--end-minute M] [--every N] [--out DIR]
+#   python frame_store.py info timelapse_images/sessions/<session>.frames
+#
+# Required library: NumPy
+
+import argparse
+import bisect
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from manifest import photo_filename
+
+FRAMES_SUFFIX = ".frames"
+INDEX_SUFFIX = ".fidx"
+FRAMES_MAGIC = b"TLFRAME1"
+INDEX_MAGIC = b"TLINDEX1"
+HEADER_SIZE = 8
+INDEX_RECORD = np.dtype([("offset", "<u8"), ("length", "<u4"), ("wall", "<f8"), ("elapsed", "<f8")])
+
+
+def index_path(frames_path):
+    return frames_path[:-len(FRAMES_SUFFIX)] + INDEX_SUFFIX if frames_path.endswith(FRAMES_SUFFIX) else frames_path + INDEX_SUFFIX
+
+
+class FrameStoreWriter:
+    """Appends encoded frames to a store. Safe to call from one writer thread at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = index_path(path)
+        self._lock = threading.Lock()
+        self._data = open(path, "ab")
+        self._index = open(self.index_path, "ab")
+        if self._data.tell() == 0:
+            self._data.write(FRAMES_MAGIC)
+        if self._index.tell() == 0:
+            self._index.write(INDEX_MAGIC)
+        self._offset = self._data.tell()
+        self.count = (self._index.tell() - HEADER_SIZE) // INDEX_RECORD.itemsize
+
+    def append(self, data, wall, elapsed):
+        """Appends one encoded frame and returns its index in the store."""
+        record = np.array([(self._offset, len(data), wall, elapsed)], dtype=INDEX_RECORD)
+        with self._lock:
+            # Frame bytes reach the disk before the index points at them, so a
+            # crash can lose the last frame but never leave a broken index entry
+            self._data.write(data)
+            self._data.flush()
+            self._index.write(record.tobytes())
+            self._index.flush()
+            self._offset += len(data)
+            self.count += 1
+            return self.count - 1
+
+    def close(self):
+        with self._lock:
+            self._data.close()
+            self._index.close()
+
+
+class FrameStore:
+    """Read-only, memory-mapped view of a frame store as it was when opened."""
+
+    def __init__(self, path):
+        self.path = path
+        self._data_file = open(path, "rb")
+        self._index_file = open(index_path(path), "rb")
+        self._data = self._map(self._data_file, FRAMES_MAGIC)
+        self._index_map = self._map(self._index_file, INDEX_MAGIC)
+        count = 0
+        if self._index_map is not None:
+            count = (len(self._index_map) - HEADER_SIZE) // INDEX_RECORD.itemsize
+        self.index = np.frombuffer(self._index_map, dtype=INDEX_RECORD, count=count, offset=HEADER_SIZE) \
+            if count else np.zeros(0, dtype=INDEX_RECORD)
+        # A writer may have indexed a frame whose bytes we can't see yet; leave it out
+        data_size = len(self._data) if self._data is not None else 0
+        while len(self.index) and int(self.index["offset"][-1]) + int(self.index["length"][-1]) > data_size:
+            self.index = self.index[:-1]
+
+    @staticmethod
+    def _map(f, magic):
+        if os.fstat(f.fileno()).st_size <= HEADER_SIZE:
+            return None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:HEADER_SIZE] != magic:
+            raise ValueError(f"'{f.name}' is not a frame store file")
+        return mapped
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame_bytes(self, i):
+        """The encoded bytes of frame `i`, as a zero-copy memoryview of the mapped file."""
+        record = self.index[i]
+        offset = int(record["offset"])
+        return memoryview(self._data)[offset:offset + int(record["length"])]
+
+    def select(self, start=None, end=None):
+        """Frame indices taken between `start` and `end` seconds into the session."""
+        # bisect reads only the ~log2(n) records it needs (searchsorted would copy the whole column)
+        elapsed = self.index["elapsed"]
+        first = 0 if start is None else bisect.bisect_left(elapsed, start)
+        last = len(elapsed) if end is None else bisect.bisect_right(elapsed, end)
+        return range(first, last)
+
+    def close(self):
+        """
+        Unmaps the store. Raises BufferError while a view from frame_bytes() or
+        the index is still in use; the maps are then freed with the last view.
+        """
+        try:
+            if self._data is not None:
+                self._data.close()
+            if self._index_map is not None:
+                # self.index is a view of the index map, so it has to go first
+                index, self.index = self.index, None
+                try:
+                    self._index_map.close()
+                except BufferError:
+                    self.index = index
+                    raise
+            self.index = None
+        finally:
+            # The maps hold their own file descriptors
+            self._data_file.close()
+            self._index_file.close()
+
+
+# Readers opened by read_frame_bytes, one per store per process
+_open_stores = {}
+
+
+def read_frame_bytes(path, i):
+    """
+    Frame `i` of the store at `path`, keeping the store mapped for the next call.
+    The store is reopened when the session has grown; a view still held from
+    before keeps the old mapping alive until it's dropped, so copy frames you
+    keep (e.g. into io.BytesIO) rather than holding the views.
+    """
+    store = _open_stores.get(path)
+    if store is None or i >= len(store):
+        # Not opened yet, or the session has grown since: swap in a fresh
+        # mapping, then release the old one's mmaps and file handles
+        old = store
+        store = _open_stores[path] = FrameStore(path)
+        if old is not None:
+            try:
+                old.close()
+            except BufferError:
+                pass  # A caller still holds one of its views; it's unmapped when that goes
+    return store.frame_bytes(i)
+
+
+# --- Command line ---
+def export(path, out_dir, start_minute=None, end_minute=None, every=1):
+    store = FrameStore(path)
+    start = start_minute * 60 if start_minute is not None else None
+    end = end_minute * 60 if end_minute is not None else None
+    os.makedirs(out_dir, exist_ok=True)
+    selected = store.select(start, end)[::every]
+    for i in selected:
+        filename = photo_filename(out_dir, float(store.index["wall"][i]))
+        with open(filename, "wb") as f:
+            f.write(store.frame_bytes(i))
+    print(f"✨ Exported {len(selected)} of {len(store)} frames to {out_dir}")
+
+
+def info(path):
+    store = FrameStore(path)
+    if not len(store):
+        print(f"{path}: empty")
+        return
+    elapsed = store.index["elapsed"]
+    total_mb = int(store.index["length"].sum()) / (1024 * 1024)
+    print(f"{path}: {len(store)} frames, {total_mb:.1f} MB, "
+          f"{elapsed[0] / 60:.1f} to {elapsed[-1] / 60:.1f} minutes into the session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a session frame store or export its frames as JPGs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write frames out as JPG files")
+    export_parser.add_argument("store", help="path to a .frames file")
+    export_parser.add_argument("--out", default="exported_frames", help="folder for the JPGs")
+    export_parser.add_argument("--start-minute", type=float, help="first minute of the session to export")
+    export_parser.add_argument("--end-minute", type=float, help="last minute of the session to export")
+    export_parser.add_argument("--every", type=int, default=1, help="export every Nth frame")
+    info_parser = commands.add_parser("info", help="show how many frames a store holds")
+    info_parser.add_argument("store", help="path to a .frames file")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.store, args.out, args.start_minute, args.end_minute, args.every)
+    else:
+        info(args.store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# A frame-by-frame animated GIF writer.
+#
+# Pillow's save(..., append_images=...) collects every frame in a list before
+# it writes anything, so memory grows with the length of the sit. This writer
+# encodes each frame as soon as it arrives and only ever holds on to the
+# previous frame (to crop unchanged areas and merge identical frames).
+#
+# Each frame is encoded with Pillow's own GIF encoder as a single-frame GIF in
+# memory, then its palette and LZW image data are spliced into the output file
+# as one more frame. The result looks the same as Pillow's multi-frame save:
+# per-frame adaptive palettes, optimised colour tables and cropped deltas.
+#
+# With a shared palette that leaves one index free, frames can also be written
+# as transparent deltas: inside the changed rectangle, every pixel within
+# `delta_tolerance` of what is already on screen becomes the transparent index
+# and the previous frame shows through (disposal "do not dispose"). Long runs
+# of one index compress far better than camera noise.
+#
+# Required libraries: Pillow, NumPy
+
+from PIL import Image
+import numpy as np
+import io
+import struct
+
+# Longest delay one GIF frame can have, in hundredths of a second (about 11 minutes)
+MAX_DELAY_CS = 0xFFFF
+
+
+def split_long_frames(timed):
+    """
+    Yields (frame, duration) pairs with no duration over the GIF maximum, by
+    repeating a frame as often as needed. For savers that can't split delays
+    themselves, like Pillow's multi-frame save.
+    """
+    for frame, duration in timed:
+        while duration > MAX_DELAY_CS * 10:
+            yield frame, MAX_DELAY_CS * 10
+            duration -= MAX_DELAY_CS * 10
+        yield frame, duration
+
+
+def quantize_frame(img):
+    """Converts a frame to palette mode the same way Pillow's GIF encoder does."""
+    if img.mode in ("P", "L"):
+        return img
+    return img.convert("RGB").convert("P", palette=Image.Palette.ADAPTIVE)
+
+
+def _changed_bbox(previous, current):
+    """Returns the (left, top, right, bottom) box of pixels that differ, or None if none do."""
+    changed = previous != current
+    if changed.ndim == 3:
+        changed = changed.any(axis=2)
+    return _mask_bbox(changed)
+
+
+def _mask_bbox(changed):
+    """Returns the (left, top, right, bottom) box of the True pixels of a 2D mask, or None."""
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def _skip_sub_blocks(data, pos):
+    """Returns the position just after a chain of GIF data sub-blocks."""
+    while True:
+        size = data[pos]
+        pos += 1
+        if size == 0:
+            return pos
+        pos += size
+
+
+def _split_single_frame(data):
+    """Splits a single-frame GIF into (colour table flags, colour table, descriptor, image data)."""
+    packed = data[10]
+    pos = 13
+    table_flags = 0
+    color_table = b""
+    if packed & 0x80:
+        table_flags = packed & 0x07
+        table_length = 3 * (2 << table_flags)
+        color_table = data[pos:pos + table_length]
+        pos += table_length
+
+    # Skip any extensions Pillow wrote ahead of the image descriptor
+    while data[pos:pos + 1] == b"!":
+        pos = _skip_sub_blocks(data, pos + 2)
+
+    if data[pos:pos + 1] != b",":
+        raise ValueError("Unexpected GIF layout from encoder")
+    descriptor = data[pos:pos + 10]
+    image_start = pos + 10
+    image_end = _skip_sub_blocks(data, image_start + 1)
+    return table_flags, color_table, descriptor, data[image_start:image_end]
+
+
+class GifStreamWriter:
+    """
+    Writes an animated GIF one frame at a time with flat memory use.
+
+    Pass a palette.GlobalPalette as `palette` to map every frame to one shared
+    colour table instead of quantizing each frame on its own. If that palette
+    has fewer than 256 colours, transparent_deltas=True uses the first free
+    index for pixels whose colour is within `delta_tolerance` (per channel) of
+    what the previous frames left on screen.
+
+    Usage:
+        with GifStreamWriter("out.gif") as gif:
+            for frame in frames:
+                gif.append(frame, duration=200)
+    """
+
+    def __init__(self, filename, loop=0, optimize=True, palette=None, transparent_deltas=False,
+                 delta_tolerance=0):
+        self.filename = filename
+        self.loop = loop
+        self.palette = palette
+        self.transparent_index = None
+        if transparent_deltas:
+            colors = len(palette.palette) // 3 if palette is not None else 256
+            if colors >= 256:
+                raise ValueError("Transparent deltas need a shared palette with at most 255 colours")
+            self.transparent_index = colors
+            colors = np.asarray(palette.palette, dtype=np.int16).reshape(-1, 3)
+            # Colour distance between every pair of palette indices, looked up per pixel
+            self._distance = np.abs(colors[:, None, :] - colors[None, :, :]).max(axis=2).astype(np.uint8)
+        self.delta_tolerance = delta_tolerance
+        # Trimming unused colours would renumber the shared palette, so only
+        # optimise the colour table when every frame has its own
+        self.optimize = optimize and palette is None
+        self.frame_count = 0
+        self._file = open(filename, "wb")
+        self._previous = None
+        self._pending = None  # (encoded frame parts, duration, offset, transparent) not yet written
+        self._size = None
+        self._global_table = None
+
+    # --- Public API ---
+    def append(self, img, duration):
+        """Adds a frame that is shown for `duration` milliseconds."""
+        if self._size is not None and img.size != self._size:
+            img = img.resize(self._size, Image.Resampling.LANCZOS)
+        if self.palette is not None:
+            frame = self.palette.apply(img)
+            pixels = np.asarray(frame)
+        else:
+            frame = quantize_frame(img)
+            pixels = np.asarray(frame.convert("RGB"))
+        self._size = frame.size
+
+        transparent = self.transparent_index is not None and self._previous is not None
+        bbox = (0, 0) + frame.size
+        if self._previous is not None:
+            if transparent:
+                changed = self._changed_mask(pixels)
+                bbox = _mask_bbox(changed)
+            else:
+                bbox = _changed_bbox(self._previous, pixels)
+            if bbox is None:
+                # Same as the last frame (within delta_tolerance): just show that one for longer
+                parts, previous_duration, offset, transparent = self._pending
+                self._pending = (parts, previous_duration + duration, offset, transparent)
+                return
+
+        if transparent:
+            frame = self._transparent_delta(pixels, changed, bbox)
+        else:
+            if bbox != (0, 0) + frame.size:
+                frame = frame.crop(bbox)
+            # Transparent deltas update the on-screen copy in place
+            self._previous = pixels.copy() if self.transparent_index is not None else pixels
+        self._flush_pending()
+        self._pending = (self._encode(frame), duration, bbox[:2], transparent)
+        self.frame_count += 1
+
+    def close(self):
+        """Writes the last frame and the GIF trailer, then closes the file."""
+        if self._file.closed:
+            return
+        self._flush_pending()
+        if self._size is not None:
+            self._file.write(b";")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- Internals ---
+    def _changed_mask(self, pixels):
+        """Pixels whose colour differs from what is on screen by more than delta_tolerance."""
+        return self._distance[self._previous, pixels] > self.delta_tolerance
+
+    def _transparent_delta(self, pixels, changed, bbox):
+        """The changed rectangle of `pixels`, with unchanged pixels made transparent."""
+        left, top, right, bottom = bbox
+        region = pixels[top:bottom, left:right].copy()
+        region_changed = changed[top:bottom, left:right]
+        region[~region_changed] = self.transparent_index
+        # Keep track of what the viewer sees: old pixels show through the transparent ones
+        screen = self._previous[top:bottom, left:right]
+        screen[region_changed] = pixels[top:bottom, left:right][region_changed]
+        frame = Image.frombytes("P", (right - left, bottom - top), region.tobytes())
+        frame.putpalette(self.palette.palette)
+        return frame
+
+    def _encode(self, frame):
+        buffer = io.BytesIO()
+        frame.save(buffer, format="GIF", optimize=self.optimize)
+        return _split_single_frame(buffer.getvalue())
+
+    def _write_header(self, table_flags, color_table):
+        width, height = self._size
+        self._file.write(b"GIF89a" + struct.pack("<HH", width, height))
+        self._file.write(bytes([0x80 | (table_flags << 4) | table_flags, 0, 0]))
+        self._file.write(color_table)
+        self._global_table = color_table
+        if self.loop is not None:
+            self._file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+
+    def _flush_pending(self):
+        if self._pending is None:
+            return
+        (table_flags, color_table, descriptor, image_data), duration, offset, transparent = self._pending
+        self._pending = None
+
+        first_frame = self._file.tell() == 0
+        if first_frame:
+            self._write_header(table_flags, color_table)
+
+        flags = descriptor[9] & 0x40  # keep the interlace bit
+        if not first_frame and color_table and color_table != self._global_table:
+            flags |= 0x80 | table_flags  # local colour table
+        # A GIF delay tops out at MAX_DELAY_CS; a frame shown for longer (a long,
+        # still stretch merged into one frame) is written again for the rest
+        delay = int(duration / 10)
+        while True:
+            self._write_frame(min(delay, MAX_DELAY_CS), transparent, offset, descriptor, flags, color_table, image_data)
+            delay -= MAX_DELAY_CS
+            if delay <= 0:
+                break
+
+    def _write_frame(self, delay, transparent, offset, descriptor, flags, color_table, image_data):
+        # Graphic Control Extension: frame delay in hundredths of a second, and
+        # for transparent deltas "do not dispose" plus the transparent index
+        packed, transparent_index = (0x05, self.transparent_index) if transparent else (0x00, 0)
+        self._file.write(b"!\xf9\x04" + bytes([packed]) + struct.pack("<H", delay)
+                         + bytes([transparent_index]) + b"\x00")
+        self._file.write(b"," + struct.pack("<HHHH", offset[0], offset[1], *struct.unpack("<HH", descriptor[5:9])))
+        self._file.write(bytes([flags]))
+        if flags & 0x80:
+            self._file.write(color_table)
+        self._file.write(image_data)
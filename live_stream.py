@@ -0,0 +1,338 @@
+# Watch the sit while it happens: a small local HTTP server for the latest photo.
+#
+# Friends can only see the GIF after the sit; with the live stream they can
+# open http://<this computer>:<port>/ during it. Endpoints:
+#
+#   /           - a page showing the stream and the status
+#   /stream     - MJPEG (multipart/x-mixed-replace): every new photo, overlay included
+#   /frame.jpg  - the latest photo
+#   /status     - JSON: minutes into the sit, photos taken, viewers
+#
+# The server runs an asyncio event loop on its own thread, so the capture loop
+# never waits for it. Each photo is the JPEG the pipeline already encoded for
+# saving: publish() stores a reference to those bytes (no copy, no second
+# encode) and wakes the loop. Every viewer is then sent the same immutable
+# bytes object.
+#
+# Each viewer sends one frame at a time and waits for the socket to drain
+# before taking the latest photo, so a slow viewer skips frames (counted in
+# frames_skipped) rather than queueing them. Memory stays at one frame per
+# viewer at most, and nothing about a viewer reaches the capture side.
+#
+# Measure publish() cost and per-viewer frame rates with dozens of local
+# viewers on a fake camera: python live_stream.py
+#
+# Required library: none beyond the standard library (the benchmark needs opencv-python)
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+BOUNDARY = b"frame"
+REQUEST_TIMEOUT_S = 10
+# Kernel send buffer per viewer. Small, so a slow viewer's socket fills after
+# about a frame and they skip to the newest photo instead of watching old ones
+SEND_BUFFER_BYTES = 256 * 1024
+
+_PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><title>Meditation timelapse</title>
+<style>body{background:#111;color:#eee;font-family:sans-serif;text-align:center}img{max-width:100%}</style>
+</head><body>
+<p id="status">Waiting for the first photo...</p>
+<img src="/stream" alt="Live photo">
+<script>
+async function poll() {
+  try {
+    const s = await (await fetch("/status")).json();
+    const mins = s.elapsed_minutes === 1 ? "1 min" : s.elapsed_minutes + " mins";
+    if (s.frames) document.getElementById("status").textContent = mins + " in, " + s.frames + " photos";
+  } catch (e) {}
+  setTimeout(poll, 5000);
+}
+poll();
+</script>
+</body></html>
+"""
+
+
+class LiveStream:
+    """
+    Serves the latest published JPEG over HTTP from a background thread.
+
+    start() binds host:port (raising OSError if it can't) and returns once the
+    server is listening. publish(jpeg, elapsed, frames) can be called from any
+    thread; `jpeg` must be bytes and is shared with every viewer as it is.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080):
+        self.host = host
+        self.port = port
+        self.published = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.viewers = 0
+        self.peak_viewers = 0
+        self._latest = None  # (sequence number, JPEG bytes, status dict), swapped as a whole
+        self._loop = None
+        self._server = None
+        self._new_frame = None
+        self._closing = False
+        self._writers = set()   # open connections, dropped on close()
+        self._handlers = set()  # their tasks, waited for on close()
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = None
+
+    # --- Capture side ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-stream", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def publish(self, jpeg, elapsed, frames):
+        """Makes `jpeg` the latest photo. Costs one reference swap and one wake-up of the server thread."""
+        self.published += 1
+        self._latest = (self.published, jpeg, dict(elapsed_minutes=int(elapsed) // 60,
+                                                   elapsed_seconds=round(elapsed, 1), frames=frames))
+        loop = self._loop
+        if loop:
+            try:
+                loop.call_soon_threadsafe(self._announce)
+            except RuntimeError:
+                # The server is shutting down
+                pass
+
+    def close(self):
+        loop = self._loop
+        if loop:
+            loop.call_soon_threadsafe(self._shutdown)
+            self._thread.join(timeout=5)
+
+    @property
+    def url(self):
+        return f"http://{'localhost' if self.host in ('', '0.0.0.0') else self.host}:{self.port}/"
+
+    def summary(self):
+        return (f"Live stream: {self.published} photos published, {self.frames_sent} frames sent, "
+                f"{self.frames_skipped} skipped for slow viewers, {self.peak_viewers} viewers at most.")
+
+    # --- Server thread ---
+    def _run(self):
+        try:
+            asyncio.run(self._serve())
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+
+    async def _serve(self):
+        self._new_frame = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._loop = asyncio.get_running_loop()
+        self._ready.set()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            # _shutdown() closed the server; let the connections finish
+            if self._handlers:
+                await asyncio.wait(self._handlers)
+        finally:
+            self._loop = None
+
+    def _shutdown(self):
+        self._closing = True
+        self._server.close()
+        for writer in self._writers:
+            writer.transport.abort()
+        self._new_frame.set()
+
+    def _announce(self):
+        # Wake every viewer waiting now; later waiters get a fresh event
+        self._new_frame.set()
+        self._new_frame = asyncio.Event()
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT_S)
+            method, path = (request.split(b"\r\n", 1)[0].split(b" ") + [b"", b""])[:2]
+            path = path.split(b"?", 1)[0]
+            if method != b"GET":
+                self._respond(writer, b"405 Method Not Allowed", b"text/plain", b"GET only\n")
+            elif path == b"/":
+                self._respond(writer, b"200 OK", b"text/html; charset=utf-8", _PAGE)
+            elif path == b"/status":
+                self._respond(writer, b"200 OK", b"application/json", json.dumps(self._status()).encode())
+            elif path == b"/frame.jpg":
+                latest = self._latest
+                if latest is None:
+                    self._respond(writer, b"503 Service Unavailable", b"text/plain", b"No photo yet\n")
+                else:
+                    self._respond(writer, b"200 OK", b"image/jpeg", latest[1])
+            elif path == b"/stream":
+                await self._stream(writer)
+            else:
+                self._respond(writer, b"404 Not Found", b"text/plain", b"Not found\n")
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+
+    @staticmethod
+    def _respond(writer, status, content_type, body):
+        writer.write(b"HTTP/1.0 " + status + b"\r\nContent-Type: " + content_type +
+                     b"\r\nContent-Length: %d\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n" % len(body))
+        writer.write(body)
+
+    def _status(self):
+        latest = self._latest
+        status = dict(latest[2]) if latest else dict(elapsed_minutes=0, elapsed_seconds=0.0, frames=0)
+        status['viewers'] = self.viewers
+        return status
+
+    async def _stream(self, writer):
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY +
+                     b"\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        # drain() returns only once this viewer's socket has taken the whole frame
+        writer.transport.set_write_buffer_limits(high=0)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+        self.viewers += 1
+        self.peak_viewers = max(self.peak_viewers, self.viewers)
+        seen = None
+        try:
+            while not self._closing:
+                latest = self._latest
+                if latest is None or latest[0] == seen:
+                    await self._new_frame.wait()
+                    continue
+                seq, jpeg, _ = latest
+                if seen is not None:
+                    self.frames_skipped += seq - seen - 1
+                seen = seq
+                # Separate writes, so the shared bytes go to the socket as they are
+                writer.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg))
+                writer.write(jpeg)
+                writer.write(b"\r\n")
+                await writer.drain()
+                self.frames_sent += 1
+        finally:
+            self.viewers -= 1
+
+
+# --- Benchmark ---
+async def _viewer(port, seconds, bytes_per_second, counts, i):
+    """Reads /stream for `seconds`, at most `bytes_per_second` (None = as fast as it can)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 16)
+    writer.write(b"GET /stream HTTP/1.0\r\n\r\n")
+    deadline = time.monotonic() + seconds
+    frames = 0
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        while time.monotonic() < deadline:
+            headers = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), deadline - time.monotonic())
+            left = int(headers.split(b"Content-Length: ")[1].split(b"\r\n")[0]) + 2
+            while left:
+                chunk = await asyncio.wait_for(reader.read(min(left, 1 << 16)), deadline - time.monotonic())
+                if not chunk:
+                    return
+                left -= len(chunk)
+                if bytes_per_second:
+                    await asyncio.sleep(len(chunk) / bytes_per_second)
+            frames += 1
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        pass
+    finally:
+        counts[i] = frames
+        writer.close()
+
+
+def _watch(port, count, slow, slow_rate, seconds, results):
+    """Runs `count` viewers (the first `slow` of them bandwidth-limited) in this process."""
+    counts = [0] * count
+
+    async def run():
+        await asyncio.gather(*(_viewer(port, seconds, slow_rate if i < slow else None, counts, i)
+                               for i in range(count)))
+    asyncio.run(run())
+    results.put(counts)
+
+
+def benchmark(viewers=(0, 12, 48), slow_share=0.25, fps=10.0, seconds=5.0):
+    """
+    A capture loop at `fps` hands fake 720p photos to a writer thread that
+    publishes them, with 0 and then dozens of viewers (in another process)
+    reading /stream. Reports how late the capture loop's wake-ups were and
+    how many frames fast and slow viewers got.
+    """
+    import cv2
+    import multiprocessing
+    import numpy as np
+    import queue
+    from fake_camera import FakeVideoCapture
+    camera = FakeVideoCapture(fps=fps)
+    jpegs = []
+    for _ in range(int(fps * seconds)):
+        _, frame = camera.read()
+        jpegs.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes())
+    size = np.mean([len(jpeg) for jpeg in jpegs])
+    # Slow viewers can take a frame and a half a second
+    slow_rate = size * 1.5
+    print(f"Photos of {size / 1024:.0f} KB at {fps:.0f} a second for {seconds:.0f}s; "
+          f"slow viewers read {slow_rate / 1024:.0f} KB/s")
+
+    for count in viewers:
+        stream = LiveStream(port=0)
+        stream.start()
+        slow = int(count * slow_share)
+        results = multiprocessing.Queue()
+        watchers = multiprocessing.Process(target=_watch, args=(stream.port, count, slow, slow_rate, seconds, results))
+        watchers.start()
+        time.sleep(0.5)
+
+        # The saving side of the pipeline: on_saved() publishes from here
+        saved = queue.Queue()
+
+        def writer():
+            while True:
+                jpeg = saved.get()
+                if jpeg is None:
+                    return
+                started = time.perf_counter()
+                stream.publish(jpeg, 0.0, stream.published + 1)
+                costs.append((time.perf_counter() - started) * 1e6)
+
+        costs = []
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        late = []
+        start = time.monotonic()
+        for n, jpeg in enumerate(jpegs):
+            deadline = start + n / fps
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            late.append((time.monotonic() - deadline) * 1000)
+            saved.put(jpeg)
+        saved.put(None)
+        writer_thread.join()
+        counts = results.get() if count else []
+        watchers.join()
+        stream.close()
+        fast_counts = counts[slow:] or [0]
+        slow_counts = counts[:slow] or [0]
+        print(f"{count:3d} viewers: capture wake-up late by median {np.median(late):.2f} ms, "
+              f"p95 {np.percentile(late, 95):.2f} ms; publish median {np.median(costs):.0f} us; "
+              f"frames per fast viewer {min(fast_counts)}-{max(fast_counts)}, per slow viewer "
+              f"{min(slow_counts)}-{max(slow_counts)} of {len(jpegs)} ({stream.frames_skipped} skipped)")
+
+
+if __name__ == "__main__":
+    benchmark()
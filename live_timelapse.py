@@ -0,0 +1,129 @@
+# Builds the timelapse GIF (or video) while the sit is still going.
+#
+# Each captured frame is handed to a background thread that shrinks it and
+# appends it to the output file straight away, so when the session ends only
+# the last frame and the file trailer are left to write. The result is ready
+# to send a moment after Ctrl+C, however long the sit was.
+#
+# Required libraries: opencv-python, Pillow, NumPy
+
+from PIL import Image
+import cv2
+import os
+import queue
+import tempfile
+import threading
+
+from gif_writer import GifStreamWriter
+from palette import GlobalPalette
+from video_writer import VideoStreamWriter
+
+# Frames waiting to be encoded. If the encoder falls this far behind, new
+# frames are dropped from the live timelapse (they are still saved as JPGs).
+MAX_QUEUED_FRAMES = 32
+# How long close() waits for the queued frames and the file trailer
+CLOSE_TIMEOUT_S = 60
+
+
+class LiveTimelapse:
+    """
+    Appends captured frames to a GIF or video on a background thread.
+
+    kind="gif" maps every frame to one palette built from the first frame
+    (the scene hardly changes during a sit). kind="video" uses VideoStreamWriter
+    (codec picked from the file extension unless `fourcc` is given).
+
+    Raises IOError (OSError) if the file can't be created or the codec can't
+    write it; errors while writing are reported once and stop the timelapse.
+    """
+
+    def __init__(self, filename, kind="gif", width=960, frame_duration_ms=200, fourcc=None):
+        if kind not in ("gif", "video"):
+            raise ValueError(f"Unknown live timelapse kind: {kind}")
+        self.filename = filename
+        self.kind = kind
+        self.width = width
+        self.frame_duration_ms = frame_duration_ms
+        self.fourcc = fourcc
+        self.frame_count = 0
+        self.dropped_frames = 0
+        self.error = None  # what stopped the live timelapse, if something did
+        self._writer = None
+        # Fail here, on the caller's thread, if the file can't be written at all
+        if kind == "video":
+            VideoStreamWriter(filename, fps=1000.0 / frame_duration_ms, codec=fourcc).check()
+        else:
+            # A temporary file next to it, so an existing file of that name is left alone
+            try:
+                fd, probe = tempfile.mkstemp(suffix=".gif", prefix=".probe_", dir=os.path.dirname(filename) or ".")
+            except OSError as e:
+                raise IOError(f"Cannot create '{filename}': {e.strerror}")
+            os.close(fd)
+            os.remove(probe)
+        self._queue = queue.Queue(maxsize=MAX_QUEUED_FRAMES)
+        self._thread = threading.Thread(target=self._run, name="live-timelapse", daemon=True)
+        self._thread.start()
+
+    def add(self, frame):
+        """Queues a BGR frame (as returned by cap.read()) without ever blocking the capture loop."""
+        if self.error is not None:
+            return
+        try:
+            self._queue.put_nowait(frame.copy())
+        except queue.Full:
+            self.dropped_frames += 1
+            print(f"⚠️ Live timelapse is behind, skipped a frame ({self.dropped_frames} skipped so far).")
+
+    def close(self):
+        """Finishes the queued frames and writes the file trailer (gives up after CLOSE_TIMEOUT_S)."""
+        try:
+            self._queue.put(None, timeout=CLOSE_TIMEOUT_S)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=CLOSE_TIMEOUT_S)
+        if self._thread.is_alive():
+            print(f"⚠️ Live timelapse still hadn't finished after {CLOSE_TIMEOUT_S}s; {self.filename} may be incomplete.")
+
+    # --- Background worker ---
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                # Keep draining, so add() and close() never wait on a dead worker
+                continue
+            try:
+                self._append(self._resize(frame))
+                self.frame_count += 1
+            except Exception as e:
+                self._fail(e)
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception as e:
+                self._fail(e)
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+            print(f"❌ Live timelapse stopped: {error}. The photos are still being saved.")
+
+    def _resize(self, frame):
+        height, width = frame.shape[:2]
+        if self.width is None or width == self.width:
+            return frame
+        new_height = int(float(height) / float(width) * self.width)
+        return cv2.resize(frame, (self.width, new_height), interpolation=cv2.INTER_AREA)
+
+    def _append(self, frame):
+        if self.kind == "video":
+            if self._writer is None:
+                self._writer = VideoStreamWriter(self.filename, fps=1000.0 / self.frame_duration_ms, codec=self.fourcc)
+            self._writer.append(frame)
+            return
+
+        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if self._writer is None:
+            self._writer = GifStreamWriter(self.filename, loop=0, palette=GlobalPalette.from_frames([img]))
+        self._writer.append(img, duration=self.frame_duration_ms)
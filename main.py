@@ -3,6 +3,18 @@ import time
 import os
 import random
 
+from live_timelapse import LiveTimelapse
+from scheduler import CaptureScheduler, fixed_interval
+from capture_pipeline import CapturePipeline
+from frame_ring import RingRecorder
+from frame_source import FrameSource, CameraWarmup, mean_brightness
+from multi_camera import MultiCamera
+from overlay import OverlayCompositor
+from manifest import SessionManifest, photo_filename, MANIFEST_DIR
+from frame_store import FrameStoreWriter, FRAMES_SUFFIX
+from stage_timing import StageTimings, NULL_TIMINGS
+from live_stream import LiveStream
+
 def prompt_user():
     print("Welcome to Meditation Timelapse!")
     while True:
@@ -49,6 +61,14 @@ def prompt_user():
     else:
         return interval, setup_delay, 'infinite', None
 
+def prompt_live_timelapse():
+    choice = input("Build the timelapse while you sit, ready the moment you stop? GIF (g), video (v), or no (n) [g/v/n]: ").strip().lower()
+    if choice == 'g':
+        return 'gif'
+    if choice == 'v':
+        return 'video'
+    return None
+
 # --- Text Overlay Settings ---
 FONT = cv2.FONT_HERSHEY_SIMPLEX
 FONT_COLOR = (255, 255, 255) # White
@@ -61,79 +81,298 @@ JOKE_FONT_THICKNESS = 2
 START_X = 20
 START_Y = 40
 LINE_GAP = 10
+OVERLAY = OverlayCompositor()
+
+# --- Camera Settings ---
+# Webcams to capture, e.g. [0, 1] for a face cam and a room cam. Several
+# cameras are read at the same moment (one thread each), and the time between
+# their frames (skew) is logged with every photo
+CAMERA_INDICES = [0]
+# How several cameras are saved: "side_by_side" in one photo, or "streams"
+# (one photo per camera, image_..._cam<N>.jpg; high-rate mode always uses side_by_side)
+CAMERA_LAYOUT = "side_by_side"
+# The camera is opened in the background while the setup questions are
+# answered; give up if it still isn't ready this long after the last answer
+CAMERA_WARMUP_TIMEOUT_S = 30
+
+# --- Timing Settings ---
+# What to do if a capture takes longer than the interval: "skip" the missed
+# photos and carry on at the next deadline, or "catch_up" by taking them back to back
+OVERRUN_POLICY = "skip"
+# How to make sure each photo is taken now, not pulled stale from the camera's
+# buffer: "grabber" (background thread), "flush" (drain the buffer) or "none"
+FRESHNESS = "grabber"
+
+# --- Pipeline Settings ---
+# Overlays, JPEG encoding and saving run on background threads so that slow
+# storage never delays the next photo
+ENCODE_WORKERS = 2        # Threads drawing overlays and encoding JPGs
+PIPELINE_QUEUE_SIZE = 8   # Frames allowed to wait at each stage
+# When storage can't keep up: "drop_oldest" or "drop_newest" waiting frame, or "block" capture
+DROP_POLICY = "drop_oldest"
+
+# --- Storage Settings ---
+# Save the photos into one append-only frame store per session
+# (timelapse_images/sessions/<session>.frames) instead of one JPG each. Handy
+# for long or high-rate sessions; gif-maker.py reads it directly and
+# "python frame_store.py export ..." turns it back into JPGs.
+FRAME_STORE = False
+
+# --- High-Rate Settings ---
+# Intervals shorter than this (e.g. 0.1 for 10 photos a second) capture straight
+# into a fixed ring of preallocated frames that a background thread saves in batches
+HIGH_RATE_INTERVAL = 1.0
+RING_CAPACITY = 32        # Frames held in memory (32 x 720p is about 90 MB)
+RING_FLUSH_BATCH = 8      # Frames saved together
+HIGH_RATE_LOG_EVERY = 10  # Print one line per this many saved photos
+
+# --- Instrumentation Settings ---
+# Time every stage (camera read, overlay, encode, write, oversleep, retries)
+# and print a table of them when the session ends
+STAGE_TIMINGS = True
+# Also write a snapshot every TIMINGS_EXPORT_EVERY_S seconds during the session:
+# a .prom file (Prometheus textfile collector) or anything else for JSON. None = don't
+TIMINGS_EXPORT_PATH = None
+TIMINGS_EXPORT_EVERY_S = 60
+
+# --- Live Stream Settings ---
+# Let friends watch while you sit: serves each new photo (overlay included) as
+# an MJPEG stream at http://<host>:<port>/, and the minutes so far and photo
+# count as JSON at /status. None = off
+LIVE_STREAM_PORT = None
+LIVE_STREAM_HOST = "127.0.0.1"  # "0.0.0.0" to let other devices on your network watch
+
+# --- Live Timelapse Settings ---
+LIVE_WIDTH = 960              # Same width as gif-maker.py
+LIVE_FRAME_DURATION_MS = 200  # Same speed as gif-maker.py
 
 # --- Helper Function ---
 def draw_text_with_bg(frame, text, top_left_position, font, scale, text_color, bg_color, thickness, padding=PADDING):
-    x, y = top_left_position
-    (text_width, text_height), baseline = cv2.getTextSize(text, font, scale, thickness)
-    bar_end = (x + text_width + padding * 2, y + text_height + baseline + padding * 2)
-    cv2.rectangle(frame, (x, y), bar_end, bg_color, -1)
-    text_baseline_y = y + text_height + padding + (baseline // 2)
-    text_position = (x + padding, text_baseline_y)
-    cv2.putText(frame, text, text_position, font, scale, text_color, thickness)
-    return bar_end[1] - y
+    # Lines drawn before are copied from cached sprites; new text is drawn with putText
+    return OVERLAY.draw_bar(frame, text, top_left_position, font, scale, text_color, bg_color, thickness, padding)
+
+def frame_shape(cap):
+    """The (height, width, 3) shape of the camera's frames, for preallocating buffers."""
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if width and height:
+        return (height, width, 3)
+    # Some backends don't report their size; ask for a frame instead
+    ret, frame = cap.read()
+    return frame.shape if ret else (720, 1280, 3)
+
+def draw_overlay(frame, lines):
+    """Draws each (text, scale, thickness) line as its own black bar, top to bottom."""
+    current_y = START_Y
+    for text, scale, thickness in lines:
+        bar_height = draw_text_with_bg(frame, text, (START_X, current_y), FONT, scale, FONT_COLOR, BG_COLOR, thickness)
+        current_y += bar_height + LINE_GAP
 
 # --- Main ---
+def open_camera():
+    if len(CAMERA_INDICES) > 1:
+        return MultiCamera(CAMERA_INDICES, freshness=FRESHNESS)
+    return FrameSource(CAMERA_INDICES[0], freshness=FRESHNESS)
+
 def main():
+    # Open the camera and let its exposure settle while the questions are answered
+    warmup = CameraWarmup(open_camera)
     interval, setup_delay, mode, limit = prompt_user()
+    live_kind = prompt_live_timelapse()
+    if not warmup.done:
+        print("Waiting for the camera to warm up...")
+    try:
+        cap = warmup.result(CAMERA_WARMUP_TIMEOUT_S)
+    except IOError as e:
+        # Reported before the sit starts, not after
+        raise IOError(f"Cannot use webcam(s) with index {', '.join(map(str, CAMERA_INDICES))}: {e}")
+    print(warmup.summary())
     print("\nREMINDER: Before you begin...")
     print("- Set a timer for your meditation session (on your phone or device).")
     print("- Enable Do Not Disturb mode to avoid interruptions.")
     input("\nPress Enter when you are ready to continue...")
+    enter_at = time.monotonic()
+    ret, _ = cap.read()
+    if not ret:
+        cap.release()
+        raise IOError("The webcam stopped giving frames. Please check it and start again.")
+    print(f"📷 Camera ready {1000 * (time.monotonic() - enter_at):.0f} ms after Enter.")
     OUTPUT_DIR = "timelapse_images"
-    CAMERA_INDEX = 0
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         print(f"Created directory: {OUTPUT_DIR}")
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    if not cap.isOpened():
-        raise IOError(f"Cannot open webcam with index {CAMERA_INDEX}")
+    multi_camera = len(CAMERA_INDICES) > 1
+    live = None
+    if live_kind:
+        extension = "gif" if live_kind == 'gif' else "mp4"
+        live_filename = os.path.join(OUTPUT_DIR, f"live_timelapse_{time.strftime('%Y%m%d-%H%M%S')}.{extension}")
+        try:
+            live = LiveTimelapse(live_filename, kind=live_kind, width=LIVE_WIDTH, frame_duration_ms=LIVE_FRAME_DURATION_MS)
+            print(f"Building live timelapse: {live_filename}")
+        except (IOError, OSError) as e:
+            print(f"⚠️ Could not start the live timelapse ({e}). Carrying on without it.")
+    stream = None
+    if LIVE_STREAM_PORT is not None:
+        stream = LiveStream(LIVE_STREAM_HOST, LIVE_STREAM_PORT)
+        try:
+            stream.start()
+            print(f"Streaming the sit live at {stream.url}")
+        except OSError as e:
+            print(f"⚠️ Could not start the live stream on port {LIVE_STREAM_PORT}: {e}. Carrying on without it.")
+            stream = None
     samsara_cycles_this_session = random.randint(999999, 99999999)
+    # One row per saved photo, so the GIF makers can find this session's frames
+    manifest = SessionManifest(OUTPUT_DIR)
+    print(f"Recording frames in {manifest.path}")
+    store = None
+    if FRAME_STORE:
+        store = FrameStoreWriter(os.path.join(OUTPUT_DIR, MANIFEST_DIR, manifest.session_id + FRAMES_SUFFIX))
+        print(f"Saving photos into {store.path}")
+
+    timings = StageTimings(TIMINGS_EXPORT_PATH, TIMINGS_EXPORT_EVERY_S) if STAGE_TIMINGS else NULL_TIMINGS
+
+    def store_frame(job):
+        job.info['store_index'] = store.append(job.data, job.info['wall'], job.info['elapsed'])
+
+    def render(job):
+        # Measure brightness before the black bars go on
+        job.info['luminance'] = mean_brightness(job.frame)
+        draw_overlay(job.frame, job.info['lines'])
+
+    def on_saved(job):
+        if store:
+            where = dict(store=os.path.basename(store.path), index=job.info['store_index'])
+        else:
+            where = dict(file=os.path.basename(job.filename))
+        manifest.append(
+            **where,
+            wall=job.info['wall'],
+            monotonic=job.info['monotonic'],
+            elapsed=job.info['elapsed'],
+            size=len(job.data),
+            luminance=round(job.info['luminance'], 2),
+            latency=job.info['latency'],
+            **{key: job.info[key] for key in ('camera', 'skew') if key in job.info}
+        )
+        # One camera's stream is enough for the live timelapse and the live stream
+        if job.info.get('camera', CAMERA_INDICES[0]) == CAMERA_INDICES[0]:
+            if live:
+                live.add(job.frame)
+            if stream:
+                # The JPEG just saved, shared as is with every viewer
+                stream.publish(job.data, job.info['elapsed'], job.info['count'])
+        if high_rate and job.info['count'] % HIGH_RATE_LOG_EVERY:
+            return
+        skew_text = f", cameras {job.info['skew'] * 1000:.0f} ms apart" if 'skew' in job.info else ""
+        saved_as = f"frame {job.info['store_index']} of {store.path}" if store else job.filename
+        print(f"[{job.info['count']}] Captured {saved_as} at {job.info['minutes_text']} ({job.info['jitter'] * 1000:+.0f} ms{skew_text}).")
+        # Sound playback removed due to stability issues
+
+    high_rate = interval < HIGH_RATE_INTERVAL
+    streams = multi_camera and CAMERA_LAYOUT == "streams" and not high_rate
+    if high_rate:
+        # Frames are decoded straight into reused buffers and saved in batches
+        pipeline = RingRecorder(frame_shape(cap), render, on_saved,
+                                capacity=RING_CAPACITY, batch_size=RING_FLUSH_BATCH,
+                                write=store_frame if store else None, timings=timings)
+        print(f"High-rate mode: {1 / interval:.1f} photos a second, {RING_CAPACITY} frames buffered.")
+    else:
+        pipeline = CapturePipeline(
+            render=render,
+            on_saved=on_saved,
+            encode_workers=ENCODE_WORKERS,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            drop_policy=DROP_POLICY,
+            write=store_frame if store else None,
+            timings=timings
+        )
     print("Starting time-lapse. Press Ctrl+C to stop.")
     image_count = 0
-    start_time = time.time()
+    # Every photo has a fixed deadline from now, so processing time never adds up
+    scheduler = CaptureScheduler(fixed_interval(interval, first=setup_delay), overrun=OVERRUN_POLICY)
     try:
         if setup_delay > 0:
             print(f"Waiting {setup_delay} seconds for you to set up before the first photo...")
-            time.sleep(setup_delay)
         while True:
-            now = time.time()
             if mode == 'photos' and image_count >= limit:
                 print("Reached requested number of photos.")
                 break
-            if mode == 'seconds' and (now - start_time) >= limit:
+            if mode == 'seconds' and scheduler.next_offset >= limit:
                 print("Reached requested duration.")
                 break
-            ret, frame = cap.read()
+            tick = scheduler.wait()
+            # How far past its deadline this photo's wake-up came
+            timings.record("oversleep", tick.jitter)
+            slot = None
+            if high_rate:
+                slot = pipeline.reserve()
+                if slot is None:
+                    # Every buffer is still waiting to be saved; this photo is dropped (and counted)
+                    continue
+            with timings.stage("read"):
+                if streams:
+                    ret, frames = cap.read_all()
+                else:
+                    ret, frame = cap.read(slot.frame if slot else None)
             if ret:
                 image_count += 1
-                elapsed_seconds = int(now - start_time)
+                elapsed_seconds = int(tick.elapsed)
                 elapsed_minutes = elapsed_seconds // 60
                 minutes_text = f"{elapsed_minutes} min" if elapsed_minutes == 1 else f"{elapsed_minutes} mins"
-                timestamp_text = time.strftime("%Y-%m-%d %H:%M:%S")
+                # Stamp the moment the frame was actually captured
+                timestamp_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cap.captured_wall))
                 # Draw only minutes and date
-                current_y = START_Y
-                for text, scale, thickness in [
+                lines = [
                     (minutes_text, PRIMARY_FONT_SCALE, PRIMARY_FONT_THICKNESS),
                     (timestamp_text, PRIMARY_FONT_SCALE, PRIMARY_FONT_THICKNESS)
-                ]:
-                    bar_height = draw_text_with_bg(frame, text, (START_X, current_y), FONT, scale, FONT_COLOR, BG_COLOR, thickness)
-                    current_y += bar_height + LINE_GAP
-                filename = os.path.join(OUTPUT_DIR, f"image_{time.strftime('%Y%m%d-%H%M%S')}.jpg")
-                cv2.imwrite(filename, frame)
-                print(f"[{image_count}] Captured {filename} at {minutes_text}.")
-                # Sound playback removed due to stability issues
+                ]
+                filename = photo_filename(OUTPUT_DIR, cap.captured_wall)
+                info = dict(lines=lines, count=image_count, minutes_text=minutes_text, jitter=tick.jitter,
+                            wall=cap.captured_wall, monotonic=cap.captured_at,
+                            elapsed=cap.captured_at - scheduler.start, latency=cap.latency)
+                if multi_camera:
+                    info['skew'] = cap.skew
+                # Overlay, encode and save happen in the background
+                if slot:
+                    pipeline.commit(slot, frame, filename, **info)
+                elif streams:
+                    for camera, camera_frame in zip(CAMERA_INDICES, frames):
+                        pipeline.submit(camera_frame, photo_filename(OUTPUT_DIR, cap.captured_wall, camera),
+                                        camera=camera, **info)
+                else:
+                    pipeline.submit(frame, filename, **info)
             else:
+                if slot:
+                    pipeline.cancel(slot)
                 print("Failed to capture frame. Retrying in 5 seconds...")
-                time.sleep(5)
-                continue
-            time.sleep(interval)
+                with timings.stage("retry"):
+                    time.sleep(5)
+                scheduler.retry()
+            timings.maybe_export()
     except KeyboardInterrupt:
         print("\nStopping time-lapse capture.")
     finally:
         # Sound playback removed due to stability issues
         cap.release()
         cv2.destroyAllWindows()
+        # Finish saving the photos still in the pipeline before closing the live timelapse
+        pipeline.close()
+        print(pipeline.summary())
+        manifest.close()
+        print(f"Frame manifest: {manifest.rows} frames in {manifest.path}")
+        if store:
+            store.close()
+            print(f"Frame store: {store.count} frames in {store.path}")
+        if live:
+            live.close()
+            if live.error is None:
+                print(f"Live timelapse saved: {live.filename} ({live.frame_count} frames)")
+        if stream:
+            stream.close()
+            print(stream.summary())
+        print(scheduler.summary())
+        print(cap.summary())
+        print(timings.summary())
+        timings.export()
         print("Webcam released. Exiting.")
 
 if __name__ == "__main__":
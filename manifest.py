@@ -0,0 +1,151 @@
+# A per-session frame manifest, written as the photos are taken.
+#
+# Each capture session gets its own append-only JSON Lines file in
+# <output folder>/sessions/, with one row per saved photo:
+#
+#   seq        - 1, 2, 3, ... in capture order
+#   file       - photo file name (inside the output folder), or for sessions
+#                saved to a frame store (frame_store.py):
+#   store      - the store's file name (inside sessions/) and
+#   index      - the photo's number in the store
+#   wall       - capture time, seconds since the epoch (time.time())
+#   monotonic  - capture time on the monotonic clock
+#   elapsed    - seconds since the session started
+#   size       - JPG size in bytes
+#   luminance  - mean brightness of the raw frame (0-255)
+#   latency    - seconds between asking the camera for a frame and its capture
+#   camera     - (several cameras saved as separate streams) the camera index
+#   skew       - (several cameras) seconds between the cameras' captures
+#
+# The GIF tools read this instead of globbing the folder, so they only pick
+# up this session's photos (not stray JPGs), in the right order, and can cut
+# a time range without opening a single image.
+
+import glob
+import json
+import os
+import threading
+import time
+
+MANIFEST_DIR = "sessions"
+MANIFEST_SUFFIX = ".jsonl"
+
+
+class SessionManifest:
+    """Appends one JSON row per saved frame to sessions/<session_id>.jsonl."""
+
+    def __init__(self, output_dir, session_id=None):
+        self.session_id = session_id or time.strftime("%Y%m%d-%H%M%S")
+        manifest_dir = os.path.join(output_dir, MANIFEST_DIR)
+        os.makedirs(manifest_dir, exist_ok=True)
+        self.path = os.path.join(manifest_dir, self.session_id + MANIFEST_SUFFIX)
+        self.rows = 0
+        self._lock = threading.Lock()
+        # Line buffered: every row reaches the disk as soon as it's written,
+        # so a crash loses at most the frame being saved
+        self._file = open(self.path, "a", buffering=1)
+
+    def append(self, **row):
+        with self._lock:
+            self.rows += 1
+            row = dict(seq=self.rows, **row)
+            self._file.write(json.dumps(row) + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def photo_filename(output_dir, captured_wall, camera=None):
+    """
+    image_YYYYmmdd-HHMMSS-mmm.jpg: milliseconds keep photos taken within the
+    same second apart. With a camera index: image_YYYYmmdd-HHMMSS-mmm-cam<N>.jpg.
+    """
+    millis = int((captured_wall % 1) * 1000)
+    suffix = f"-cam{camera}" if camera is not None else ""
+    return os.path.join(output_dir, f"image_{time.strftime('%Y%m%d-%H%M%S', time.localtime(captured_wall))}-{millis:03d}{suffix}.jpg")
+
+
+# --- Reading ---
+def list_sessions(folder="."):
+    """Returns the session ids with a manifest in `folder`, oldest first."""
+    pattern = os.path.join(folder, MANIFEST_DIR, "*" + MANIFEST_SUFFIX)
+    return sorted(os.path.basename(path)[:-len(MANIFEST_SUFFIX)] for path in glob.glob(pattern))
+
+
+def latest_session(folder="."):
+    """
+    The most recent session that saved at least one photo, or None. Sessions
+    stopped before their first photo leave an empty manifest, which is skipped.
+    """
+    for session in reversed(list_sessions(folder)):
+        if os.path.getsize(os.path.join(folder, MANIFEST_DIR, session + MANIFEST_SUFFIX)) > 0:
+            return session
+    return None
+
+
+def read_manifest(folder=".", session="latest"):
+    """Returns the rows of one session's manifest ("latest" = most recent session with photos)."""
+    if session == "latest":
+        session = latest_session(folder)
+        if session is None:
+            return []
+    rows = []
+    with open(os.path.join(folder, MANIFEST_DIR, session + MANIFEST_SUFFIX)) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # A half-written last line from a crash; everything before it is fine
+                break
+    return rows
+
+
+def find_rows(folder=".", session="latest", start=None, end=None, camera="first"):
+    """
+    The manifest rows find_frames() picks (same arguments), for callers that
+    also want the capture times. Returns None if the folder has no manifests
+    (or, for "latest", only empty ones).
+    """
+    if not list_sessions(folder) or (session == "latest" and latest_session(folder) is None):
+        return None
+    rows = read_manifest(folder, session)
+    if camera == "first":
+        camera = next((row["camera"] for row in rows if "camera" in row), None)
+    picked = []
+    for row in rows:
+        if camera is not None and row.get("camera", camera) != camera:
+            continue
+        if (start is not None and row["elapsed"] < start) or (end is not None and row["elapsed"] > end):
+            continue
+        picked.append(row)
+    return picked
+
+
+def row_frame(folder, row):
+    """The photo of a manifest row: a file path, or a (store path, index) pair."""
+    if "store" in row:
+        return (os.path.join(folder, MANIFEST_DIR, row["store"]), row["index"])
+    return os.path.join(folder, row["file"]) if folder != "." else row["file"]
+
+
+def find_frames(folder=".", session="latest", start=None, end=None, camera="first"):
+    """
+    Returns the photos of a session, in capture order, optionally limited to
+    those taken between `start` and `end` seconds into the session. Each is a
+    file path, or a (store path, index) pair for photos kept in a frame store;
+    frame_loader.open_image() opens either.
+
+    Sessions that saved several cameras as separate streams only return one
+    camera's photos: `camera` is its index, or "first" for the first camera.
+
+    Returns None if the folder has no manifests (e.g. photos from an older
+    version of the capture scripts), so callers can fall back to globbing.
+    """
+    rows = find_rows(folder, session, start, end, camera)
+    if rows is None:
+        return None
+    return [row_frame(folder, row) for row in rows]
@@ -0,0 +1,192 @@
+# Several webcams captured together, e.g. a face cam and a wide room cam.
+#
+# Reading N cameras one after another makes every photo take N times as long
+# (each read waits for its camera's next frame), and the cameras' frames end
+# up further apart in time the more there are. MultiCamera instead gives each
+# camera its own FrameSource and its own reader thread. read() notes the
+# trigger time on the shared monotonic clock and releases all readers at once;
+# each waits for its camera's first frame after the trigger (see
+# frame_source.py), so a capture takes as long as the slowest camera, not the
+# sum of them.
+#
+# Every capture records the skew: how far apart, in time, the cameras' frames
+# were taken (latest capture time minus earliest).
+#
+# Output is either one side-by-side frame (layout "side_by_side", which makes
+# MultiCamera a drop-in for FrameSource) or one frame per camera (read_all(),
+# for saving each camera as its own stream).
+#
+# Measure capture time and skew for 1-4 fake cameras with: python multi_camera.py
+#
+# Required libraries: opencv-python, NumPy
+
+import cv2
+import numpy as np
+import threading
+import time
+
+from frame_source import FrameSource
+
+LAYOUTS = ("side_by_side", "streams")
+
+
+def composed_shape(shapes):
+    """The (height, width, 3) of frames of `shapes` placed side by side, scaled to the smallest height."""
+    height = min(shape[0] for shape in shapes)
+    width = sum(round(shape[1] * height / shape[0]) for shape in shapes)
+    return (height, width, 3)
+
+
+def compose_side_by_side(frames, out=None):
+    """Places frames left to right, scaled to the smallest height. Draws into `out` if it has the right shape."""
+    shape = composed_shape([frame.shape for frame in frames])
+    if out is None or out.shape != shape:
+        out = np.empty(shape, dtype=np.uint8)
+    height = shape[0]
+    x = 0
+    for frame in frames:
+        width = round(frame.shape[1] * height / frame.shape[0])
+        target = out[:, x:x + width]
+        if frame.shape[:2] == (height, width):
+            np.copyto(target, frame)
+        else:
+            # Writes straight into the composed frame, no intermediate copy
+            cv2.resize(frame, (width, height), dst=target, interpolation=cv2.INTER_AREA)
+        x += width
+    return out
+
+
+class MultiCamera:
+    """
+    N cameras read concurrently, behind the FrameSource API (isOpened, read,
+    release, get, set, summary, captured_at, captured_wall, latency).
+
+    read(image) returns the side-by-side frame; read_all() returns
+    (ok, [frame per camera]). After either, `skew` is the spread of the
+    cameras' capture times and `captured_at`/`captured_wall` are the earliest.
+    Pass `captures` (one cv2.VideoCapture-like object per camera) to use
+    something other than real webcams.
+    """
+
+    def __init__(self, camera_indices, freshness="grabber", captures=None):
+        self.camera_indices = list(camera_indices)
+        captures = captures or [None] * len(self.camera_indices)
+        self.sources = [FrameSource(index, freshness=freshness, capture=capture)
+                        for index, capture in zip(self.camera_indices, captures)]
+        self.captured_at = None
+        self.captured_wall = None
+        self.latency = None
+        self.skew = None
+        self.skews = []
+
+        self._trigger = threading.Condition()
+        self._generation = 0
+        self._results = [None] * len(self.sources)
+        self._done = 0
+        self._running = True
+        self._readers = [
+            threading.Thread(target=self._reader_loop, args=(i,), name=f"camera-reader-{index}", daemon=True)
+            for i, index in enumerate(self.camera_indices)
+        ]
+        for thread in self._readers:
+            thread.start()
+
+    # --- FrameSource-compatible API ---
+    def isOpened(self):
+        return all(source.isOpened() for source in self.sources)
+
+    def read(self, image=None):
+        """Captures every camera and returns the side-by-side frame (drawn into `image` if it fits)."""
+        ok, frames = self.read_all()
+        if not ok:
+            return False, None
+        return True, compose_side_by_side(frames, image)
+
+    def read_all(self):
+        """Captures every camera at once. Returns (ok, frames), frames in camera_indices order."""
+        requested_at = time.monotonic()
+        with self._trigger:
+            self._generation += 1
+            self._done = 0
+            self._trigger.notify_all()
+            self._trigger.wait_for(lambda: self._done == len(self.sources))
+            results = list(self._results)
+        if not all(ret for ret, _ in results):
+            return False, None
+        captured = [source.captured_at for source in self.sources]
+        first = captured.index(min(captured))
+        self.captured_at = captured[first]
+        self.captured_wall = self.sources[first].captured_wall
+        self.latency = max(captured) - requested_at
+        self.skew = max(captured) - min(captured)
+        self.skews.append(self.skew)
+        return True, [frame for _, frame in results]
+
+    def release(self):
+        with self._trigger:
+            self._running = False
+            self._trigger.notify_all()
+        for thread in self._readers:
+            thread.join()
+        for source in self.sources:
+            source.release()
+
+    def get(self, prop_id):
+        """Frame width and height are those of the side-by-side frame; anything else comes from the first camera."""
+        if prop_id in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            shapes = [(int(source.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(source.get(cv2.CAP_PROP_FRAME_WIDTH)))
+                      for source in self.sources]
+            if not all(height and width for height, width in shapes):
+                return 0.0
+            height, width, _ = composed_shape(shapes)
+            return float(width if prop_id == cv2.CAP_PROP_FRAME_WIDTH else height)
+        return self.sources[0].get(prop_id)
+
+    def set(self, prop_id, value):
+        return all([source.set(prop_id, value) for source in self.sources])
+
+    # --- Reporting ---
+    def summary(self):
+        lines = [source.summary() for source in self.sources]
+        if self.skews:
+            mean_ms = 1000 * sum(self.skews) / len(self.skews)
+            lines.append(f"Cameras {self.camera_indices}: skew between cameras mean {mean_ms:.1f} ms, "
+                         f"max {1000 * max(self.skews):.1f} ms over {len(self.skews)} captures.")
+        return "\n".join(lines)
+
+    # --- Reader threads ---
+    def _reader_loop(self, i):
+        seen = 0
+        while True:
+            with self._trigger:
+                self._trigger.wait_for(lambda: self._generation != seen or not self._running)
+                if not self._running:
+                    return
+                seen = self._generation
+            result = self.sources[i].read()
+            with self._trigger:
+                self._results[i] = result
+                self._done += 1
+                self._trigger.notify_all()
+
+
+# --- Benchmark ---
+def benchmark(captures=30, fps=30.0):
+    """Times read() and measures skew for 1 to 4 fake 720p cameras."""
+    from fake_camera import FakeVideoCapture
+    for count in range(1, 5):
+        cameras = MultiCamera(range(count), captures=[FakeVideoCapture(i, fps=fps, seed=i) for i in range(count)])
+        times = []
+        for _ in range(captures):
+            started = time.perf_counter()
+            ok, frame = cameras.read()
+            times.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+        cameras.release()
+        skews = np.asarray(cameras.skews) * 1000
+        print(f"{count} camera{'s' if count > 1 else ' '}: read median {np.median(times):.1f} ms, "
+              f"skew median {np.median(skews):.1f} ms, max {skews.max():.1f} ms, frame {frame.shape[1]}x{frame.shape[0]}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,143 @@
+# Fast text overlays from cached, pre-rendered sprites.
+#
+# draw_text_with_bg used to call cv2.getTextSize, cv2.rectangle and
+# cv2.putText on the full frame for every line of every photo, even for lines
+# like "Samsara Cycles Left: ..." that never change within a session. Instead:
+#
+#   - every finished bar (black box + text) is kept in a small LRU cache keyed
+#     by (text, font, scale, thickness, colours, padding), so a static line
+#     costs one NumPy copy into the frame
+#   - a line is drawn straight onto the frame with cv2.rectangle and
+#     cv2.putText the first time, so lines that change every photo (e.g. the
+#     timestamp) cost what they always did. The second time, the same calls
+#     draw it onto a small canvas the size of the bar, which becomes the
+#     sprite: it holds exactly the pixels they drew
+#
+# A few lines (e.g. "Elapsed" at scale 3 in every-5-mins.py) have anti-aliased
+# stroke pixels that reach past their bar and blend with the photo underneath.
+# A sprite can't reproduce those, so they are always drawn straight onto the
+# frame.
+#
+# Required libraries: opencv-python, NumPy
+
+import cv2
+import numpy as np
+import threading
+from collections import OrderedDict
+
+# Finished bars kept in memory (the oldest is dropped first)
+MAX_CACHED_LINES = 256
+
+
+def blit(frame, sprite, x, y):
+    """Copies `sprite` into `frame` with its top-left corner at (x, y), clipped to the frame."""
+    frame_h, frame_w = frame.shape[:2]
+    sprite_h, sprite_w = sprite.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite_w, frame_w), min(y + sprite_h, frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+    frame[y0:y1, x0:x1] = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+
+
+class OverlayCompositor:
+    """
+    Draws text bars onto frames from cached sprites, pixel for pixel the same
+    as drawing them with cv2.rectangle and cv2.putText.
+
+    draw_bar() matches draw_text_with_bg in main.py / every-5-mins.py (bar
+    anchored at its top-left corner); draw_label() matches the one in test.py
+    (text anchored at its baseline, box drawn around it).
+    """
+
+    def __init__(self, max_cached_lines=MAX_CACHED_LINES):
+        self.max_cached_lines = max_cached_lines
+        self.hits = 0
+        self.misses = 0
+        self._lines = OrderedDict()
+        # Capture pipelines draw from several threads at once
+        self._lock = threading.Lock()
+
+    # --- Public API ---
+    def draw_bar(self, frame, text, top_left_position, font, scale, text_color, bg_color, thickness, padding):
+        """Draws a bar with its top-left corner at `top_left_position`. Returns the bar height."""
+        line = self._line("bar", text, font, scale, text_color, bg_color, thickness, padding)
+        self._draw(frame, line, top_left_position, text, font, scale, text_color, bg_color, thickness)
+        return line[3][1] - 1
+
+    def draw_label(self, frame, text, position, font, scale, text_color, bg_color, thickness, padding):
+        """Draws text with its baseline starting at `position` and a box around it."""
+        line = self._line("label", text, font, scale, text_color, bg_color, thickness, padding)
+        self._draw(frame, line, position, text, font, scale, text_color, bg_color, thickness)
+
+    def stats(self):
+        return f"Overlay cache: {self.hits} hits, {self.misses} misses."
+
+    # --- Sprites ---
+    def _line(self, layout, text, font, scale, text_color, bg_color, thickness, padding):
+        """
+        The cached [sprite, bar offset, text origin, bar size, times drawn] for
+        a line. The sprite is None until the line is drawn a second time, and
+        stays None for lines whose strokes reach past the bar.
+        """
+        key = (layout, text, font, scale, tuple(text_color), tuple(bg_color), thickness, padding)
+        with self._lock:
+            line = self._lines.get(key)
+            if line is not None:
+                self._lines.move_to_end(key)
+                line[4] += 1
+                if line[0] is not None or line[4] > 2:
+                    self.hits += 1
+                    return line
+            self.misses += 1
+
+        if line is None:
+            (text_width, text_height), baseline = cv2.getTextSize(text, font, scale, thickness)
+            width = text_width + padding * 2 + 1
+            if layout == "bar":
+                # Same geometry as draw_text_with_bg in main.py
+                height = text_height + baseline + padding * 2 + 1
+                origin = (padding, text_height + padding + (baseline // 2))
+                offset = (0, 0)
+            else:
+                # Same geometry as draw_text_with_bg in test.py
+                height = text_height + baseline * 2 + padding * 2 + 1
+                origin = (padding, text_height + baseline + padding)
+                offset = (-padding, -(text_height + baseline + padding))  # bar corner relative to the baseline
+            line = [None, offset, origin, (width, height), 1]
+            with self._lock:
+                self._lines[key] = line
+                while len(self._lines) > self.max_cached_lines:
+                    self._lines.popitem(last=False)
+        else:
+            # Drawn before: worth keeping as a sprite
+            line[0] = self._render(text, font, scale, text_color, bg_color, thickness, line[2], line[3])
+        return line
+
+    @staticmethod
+    def _render(text, font, scale, text_color, bg_color, thickness, origin, size):
+        """The bar as a sprite, or None if some of the text's pixels fall outside it."""
+        width, height = size
+        # Draw on a canvas a little bigger than the bar. The border around the
+        # bar is a colour far from the text colour, so any stroke pixel that
+        # lands outside the bar shows up there
+        margin = thickness + 2
+        contrast = tuple(0 if channel >= 128 else 255 for channel in text_color[:3])
+        canvas = np.empty((height + margin * 2, width + margin * 2, 3), dtype=np.uint8)
+        cv2.rectangle(canvas, (0, 0), (canvas.shape[1] - 1, canvas.shape[0] - 1), contrast, -1)
+        cv2.rectangle(canvas, (margin, margin), (margin + width - 1, margin + height - 1), bg_color, -1)
+        cv2.putText(canvas, text, (origin[0] + margin, origin[1] + margin), font, scale, text_color, thickness)
+        sprite = canvas[margin:margin + height, margin:margin + width].copy()
+        cv2.rectangle(canvas, (margin, margin), (margin + width - 1, margin + height - 1), contrast, -1)
+        if cv2.absdiff(canvas, contrast).any():
+            return None
+        return sprite
+
+    def _draw(self, frame, line, position, text, font, scale, text_color, bg_color, thickness):
+        sprite, offset, origin, (width, height), _ = line
+        x, y = position[0] + offset[0], position[1] + offset[1]
+        if sprite is not None:
+            blit(frame, sprite, x, y)
+            return
+        cv2.rectangle(frame, (x, y), (x + width - 1, y + height - 1), bg_color, -1)
+        cv2.putText(frame, text, (x + origin[0], y + origin[1]), font, scale, text_color, thickness)
@@ -0,0 +1,93 @@
+# One shared GIF palette for a whole session, plus fast NumPy colour mapping.
+#
+# Quantizing every frame on its own is the slowest part of building a GIF, and
+# because each frame gets a slightly different palette, near-identical frames
+# flicker. Instead we build one palette from a sample of the frames, work out
+# the nearest palette colour for every cell of a 32x32x32 RGB grid once, and
+# then map each frame to the palette with a single NumPy table lookup.
+#
+# Required libraries: Pillow, NumPy
+
+from PIL import Image
+import numpy as np
+
+# Bits kept per channel when looking colours up (5 bits -> a 32x32x32 table)
+LUT_BITS = 5
+# Sampled frames are shrunk by this factor before building the palette
+SAMPLE_SHRINK = 4
+
+
+def sample_evenly(items, count):
+    """Picks up to `count` items spread evenly from start to end."""
+    if len(items) <= count:
+        return list(items)
+    step = (len(items) - 1) / (count - 1) if count > 1 else 0
+    return [items[round(i * step)] for i in range(count)]
+
+
+def build_palette(frames, colors=256):
+    """
+    Builds one palette from a handful of sample frames.
+
+    Returns the palette as a flat [r, g, b, r, g, b, ...] list of `colors` entries.
+    """
+    thumbs = []
+    for frame in frames:
+        width, height = frame.size
+        size = (max(1, width // SAMPLE_SHRINK), max(1, height // SAMPLE_SHRINK))
+        thumbs.append(np.asarray(frame.convert("RGB").resize(size, Image.Resampling.BOX)))
+    if not thumbs:
+        raise ValueError("Need at least one frame to build a palette")
+
+    # Stack the thumbnails into one tall image and let Pillow's median cut pick the colours
+    width = min(thumb.shape[1] for thumb in thumbs)
+    mosaic = Image.fromarray(np.concatenate([thumb[:, :width] for thumb in thumbs]))
+    quantized = mosaic.quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()[:colors * 3]
+    # Pad to exactly `colors` entries so the colour table has a stable size
+    palette += [0] * (colors * 3 - len(palette))
+    return palette
+
+
+def build_lut(palette):
+    """
+    Precomputes the nearest palette index for every cell of a 32x32x32 RGB grid.
+
+    Returns a (32, 32, 32) uint8 array indexed by [r >> 3, g >> 3, b >> 3].
+    """
+    levels = 1 << LUT_BITS
+    step = 256 // levels
+    colors = np.asarray(palette, dtype=np.int32).reshape(-1, 3)
+
+    # Centre of each grid cell, e.g. 4, 12, 20, ... for 8-wide cells
+    centres = np.arange(levels, dtype=np.int32) * step + step // 2
+    grid = np.stack(np.meshgrid(centres, centres, centres, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    lut = np.empty(len(grid), dtype=np.uint8)
+    # Work through the grid in chunks so the distance matrix stays small
+    chunk = 4096
+    for start in range(0, len(grid), chunk):
+        diff = grid[start:start + chunk, None, :] - colors[None, :, :]
+        lut[start:start + chunk] = np.argmin((diff * diff).sum(axis=2), axis=1)
+    return lut.reshape(levels, levels, levels)
+
+
+class GlobalPalette:
+    """A fixed palette plus its lookup table, ready to map frames in one vectorized step."""
+
+    def __init__(self, palette):
+        self.palette = palette
+        self.lut = build_lut(palette)
+
+    @classmethod
+    def from_frames(cls, frames, colors=256):
+        return cls(build_palette(frames, colors))
+
+    def apply(self, img):
+        """Maps an RGB frame to this palette and returns a "P" mode image."""
+        shift = 8 - LUT_BITS
+        rgb = np.asarray(img.convert("RGB")) >> shift
+        indices = self.lut[rgb[..., 0], rgb[..., 1], rgb[..., 2]]
+        out = Image.frombytes("P", img.size, indices.tobytes())
+        out.putpalette(self.palette)
+        return out
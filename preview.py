@@ -2,10 +2,29 @@ import cv2
 import time
 import os
 
+from scheduler import CaptureScheduler, ramp
+from frame_source import DutyCycledCamera
+from preview_window import LivePreview
+from manifest import SessionManifest
+
 # --- Configuration ---
 CAPTURE_INTERVAL = 300  # 300 seconds = 5 minutes
 OUTPUT_DIR = "timelapse_images"
 CAMERA_INDEX = 0
+# Capture times in seconds from the end of framing: 1 min, 5 mins, then every CAPTURE_INTERVAL
+FIRST_CAPTURES = [60, 300]
+# If a capture runs past the next deadline: "skip" the missed photo or "catch_up"
+OVERRUN_POLICY = "skip"
+# Power saving: switch the webcam off between photos and turn it back on just
+# early enough to warm up (measured) and let the exposure settle
+POWER_SAVING = True
+# Framing preview: frames a second shown, and the width they are shrunk to
+PREVIEW_MAX_FPS = 5
+PREVIEW_MAX_WIDTH = 640
+# Show a frame every PEEK_EVERY_S seconds while waiting for the next photo
+# (None = no peeks). Peeks stop in time for each photo; they need the camera
+# on, so they are skipped when POWER_SAVING switches it off between photos.
+PEEK_EVERY_S = None
 
 # --- Text Overlay Settings ---
 FONT = cv2.FONT_HERSHEY_SIMPLEX
@@ -15,82 +34,87 @@ FONT_THICKNESS = 4
 ELAPSED_TEXT_POSITION = (20, 120)
 TIMESTAMP_TEXT_POSITION = (20, 240)
 
+# --- Helper Function ---
+def draw_overlay(frame, elapsed_minutes, wall=None):
+    """Draws the elapsed minutes and the timestamp, as on the saved photos and in the preview."""
+    elapsed_text = f"{elapsed_minutes} mins"
+    timestamp_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(wall))
+    cv2.putText(frame, elapsed_text, ELAPSED_TEXT_POSITION, FONT, FONT_SCALE, FONT_COLOR, FONT_THICKNESS)
+    cv2.putText(frame, timestamp_text, TIMESTAMP_TEXT_POSITION, FONT, FONT_SCALE, FONT_COLOR, FONT_THICKNESS)
+
 # --- Setup ---
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
     print(f"Created directory: {OUTPUT_DIR}")
 
-cap = cv2.VideoCapture(CAMERA_INDEX)
+if POWER_SAVING:
+    cap = DutyCycledCamera(CAMERA_INDEX)
+else:
+    cap = cv2.VideoCapture(CAMERA_INDEX)
 
 if not cap.isOpened():
     raise IOError(f"Cannot open webcam with index {CAMERA_INDEX}")
 
 # --- NEW: Live Preview for Framing 📸 ---
 print("Starting live preview. Frame your shot, then press 'Q' to start the timelapse.")
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Failed to get frame for preview.")
-        break
-    
-    # Display the resulting frame in a window
-    cv2.imshow('Live Preview - Press Q to Start Timelapse', frame)
-    
-    # Wait for the 'q' key to be pressed to exit the preview
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+# A few small frames a second with the photo overlay drawn on, instead of every full-size frame
+preview = LivePreview('Live Preview - Press Q to Start Timelapse', render=lambda frame: draw_overlay(frame, 0),
+                      max_fps=PREVIEW_MAX_FPS, max_width=PREVIEW_MAX_WIDTH)
+if not preview.run(cap):
+    print("Failed to get frame for preview.")
 
 # Destroy the preview window before starting the main loop
-cv2.destroyAllWindows()
+preview.close()
 print("Framing complete. Starting time-lapse sequence...")
 # --- END of new section ---
 
 
 # --- Main Loop ---
 image_count = 0
+# One row per photo, so the GIF tools pick up this session and not an older one
+manifest = SessionManifest(OUTPUT_DIR)
+# Deadlines are measured from here on the monotonic clock, so they never drift
+scheduler = CaptureScheduler(ramp(FIRST_CAPTURES, CAPTURE_INTERVAL), overrun=OVERRUN_POLICY)
+peek = None
+if PEEK_EVERY_S and POWER_SAVING:
+    print("⚠️ Peeks need the camera on between photos; set POWER_SAVING = False to use them.")
+elif PEEK_EVERY_S:
+    peek = LivePreview('Timelapse - Peek', max_width=PREVIEW_MAX_WIDTH,
+                       render=lambda frame: draw_overlay(frame, int((time.monotonic() - scheduler.start) / 60)))
 try:
     while True:
-        # --- DYNAMIC WAIT LOGIC ---
-        if image_count == 0:
-            wait_time_seconds = 60
-            print("Waiting for 1 minute to take the first photo...")
-        elif image_count == 1:
-            wait_time_seconds = 240
-            print("Waiting for 4 minutes for the next photo (at the 5-minute mark)...")
-        else:
-            wait_time_seconds = CAPTURE_INTERVAL
-            interval_in_minutes = int(wait_time_seconds / 60)
-            print(f"Waiting for {interval_in_minutes} minutes until the next capture...")
-
-        time.sleep(wait_time_seconds)
+        # --- WAIT FOR THE NEXT DEADLINE ---
+        if not scheduler.retrying:
+            next_minutes = int(scheduler.next_offset / 60)
+            print(f"Waiting {max(0, scheduler.seconds_until_next()):.0f} seconds for the next photo (at the {next_minutes}-minute mark)...")
+        if POWER_SAVING:
+            cap.idle_for(scheduler.seconds_until_next())
+        if peek:
+            peek.peek(cap, scheduler.seconds_until_next, every=PEEK_EVERY_S)
+        tick = scheduler.wait()
         
         # --- CAPTURE AND PROCESS IMAGE ---
         ret, frame = cap.read()
+        captured_wall, captured_at = time.time(), time.monotonic()
         
         if ret:
             image_count += 1
             
-            if image_count == 1:
-                elapsed_minutes = 1
-            else:
-                interval_in_minutes = int(CAPTURE_INTERVAL / 60)
-                elapsed_minutes = interval_in_minutes * (image_count - 1)
-            
-            elapsed_text = f"{elapsed_minutes} mins"
-            timestamp_text = time.strftime("%Y-%m-%d %H:%M:%S")
-
-            cv2.putText(frame, elapsed_text, ELAPSED_TEXT_POSITION, FONT, FONT_SCALE, FONT_COLOR, FONT_THICKNESS)
-            cv2.putText(frame, timestamp_text, TIMESTAMP_TEXT_POSITION, FONT, FONT_SCALE, FONT_COLOR, FONT_THICKNESS)
+            elapsed_minutes = int(tick.offset / 60)
+            draw_overlay(frame, elapsed_minutes)
             
             file_timestamp = time.strftime("%Y%m%d-%H%M%S")
             filename = os.path.join(OUTPUT_DIR, f"image_{file_timestamp}.jpg")
             cv2.imwrite(filename, frame)
+            manifest.append(file=os.path.basename(filename), wall=captured_wall, monotonic=captured_at,
+                            elapsed=captured_at - scheduler.start, size=os.path.getsize(filename))
             
-            print(f"[{image_count}] Captured {filename} at approx. {elapsed_minutes} minutes.")
+            print(f"[{image_count}] Captured {filename} at {elapsed_minutes} minutes ({tick.jitter * 1000:+.0f} ms).")
             
         else:
             print("Failed to capture frame. Retrying in 5 seconds...")
             time.sleep(5)
+            scheduler.retry()
 
 except KeyboardInterrupt:
     print("\nStopping time-lapse capture.")
@@ -98,4 +122,12 @@ except KeyboardInterrupt:
 finally:
     cap.release()
     cv2.destroyAllWindows()
+    manifest.close()
+    print(f"Frame manifest: {manifest.rows} frames in {manifest.path}")
+    print(scheduler.summary())
+    print(preview.summary())
+    if peek:
+        print(peek.summary("Peeks"))
+    if POWER_SAVING:
+        print(cap.summary())
     print("Webcam released. Exiting.")
\ No newline at end of file
@@ -0,0 +1,156 @@
+# A live camera preview that barely uses the CPU.
+#
+# Framing the shot used to read, and show, every full-resolution frame with
+# cv2.waitKey(1) in between: 30 frames a second of decode and window redraw,
+# which kept a core busy for as long as framing took. LivePreview instead:
+#
+#   - shows at most max_fps frames a second, waiting in cv2.waitKey (which
+#     sleeps, but keeps the window responsive) rather than spinning
+#   - draws the same overlay as the saved photos (via `render`) and then
+#     shrinks the frame to max_width before it goes to the window
+#   - measures its own CPU use (process CPU time / wall time) so the saving
+#     is visible in summary()
+#
+# peek() shows a frame now and then while waiting for the next photo, and
+# stops early enough that it can never delay it.
+#
+# Measure the CPU use of both loops on a fake MJPG camera with: python preview_window.py
+#
+# Required libraries: opencv-python, NumPy
+
+import cv2
+import time
+
+PREVIEW_MAX_FPS = 5
+PREVIEW_MAX_WIDTH = 640
+PEEK_EVERY_S = 10.0
+PEEK_GUARD_S = 2.0  # Stop peeking this long before the next photo
+
+
+def downscale(frame, max_width=PREVIEW_MAX_WIDTH):
+    """The frame shrunk to max_width pixels wide (unchanged if it's already narrower)."""
+    height, width = frame.shape[:2]
+    if width <= max_width:
+        return frame
+    return cv2.resize(frame, (max_width, round(height * max_width / width)), interpolation=cv2.INTER_AREA)
+
+
+class LivePreview:
+    """
+    A throttled, downscaled preview window.
+
+    render(frame), if given, draws the capture overlay onto the full-size frame
+    before it is shrunk, so the preview shows exactly what a photo would.
+    """
+
+    def __init__(self, window_name, render=None, max_fps=PREVIEW_MAX_FPS, max_width=PREVIEW_MAX_WIDTH):
+        self.window_name = window_name
+        self.render = render
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.frames_shown = 0
+        self.shown_for = 0.0  # wall seconds spent in run()/peek()
+        self.cpu_used = 0.0   # process CPU seconds spent in run()/peek()
+
+    def show(self, frame):
+        """Draws the overlay, shrinks and displays one frame (the frame is drawn on, so pass one you don't keep)."""
+        if self.render:
+            self.render(frame)
+        cv2.imshow(self.window_name, downscale(frame, self.max_width))
+        self.frames_shown += 1
+
+    def run(self, cap, quit_key="q"):
+        """Shows `cap` until quit_key is pressed. Returns False if the camera stopped giving frames."""
+        period = 1.0 / self.max_fps
+        started, cpu_started = time.monotonic(), time.process_time()
+        try:
+            while True:
+                frame_started = time.monotonic()
+                ret, frame = cap.read()
+                if not ret:
+                    return False
+                self.show(frame)
+                # Sleep in waitKey until the next frame is due, so the window keeps responding
+                wait_ms = max(1, int((period - (time.monotonic() - frame_started)) * 1000))
+                if cv2.waitKey(wait_ms) & 0xFF == ord(quit_key):
+                    return True
+        finally:
+            self.shown_for += time.monotonic() - started
+            self.cpu_used += time.process_time() - cpu_started
+
+    def peek(self, cap, seconds_left, every=PEEK_EVERY_S, guard=PEEK_GUARD_S):
+        """Shows a frame from `cap` every `every` seconds until seconds_left() is within `guard` seconds."""
+        started, cpu_started = time.monotonic(), time.process_time()
+        try:
+            while seconds_left() > guard:
+                ret, frame = cap.read()
+                if ret:
+                    self.show(frame)
+                wait_s = min(every, seconds_left() - guard)
+                if wait_s > 0:
+                    cv2.waitKey(max(1, int(wait_s * 1000)))
+        finally:
+            self.shown_for += time.monotonic() - started
+            self.cpu_used += time.process_time() - cpu_started
+
+    def close(self):
+        cv2.destroyWindow(self.window_name)
+
+    def summary(self, label="Preview"):
+        if not self.shown_for:
+            return f"{label}: not shown."
+        return (f"{label}: {self.frames_shown} frames at {self.frames_shown / self.shown_for:.1f} fps, "
+                f"{100 * self.cpu_used / self.shown_for:.1f}% of one CPU core.")
+
+
+# --- Benchmark ---
+class _MjpegCamera:
+    """A fake camera whose reads decode a JPEG, as a webcam in MJPG mode does."""
+
+    def __init__(self, width, height):
+        from fake_camera import FakeVideoCapture
+        self.camera = FakeVideoCapture(width=width, height=height, fps=30.0)
+        _, frame = self.camera.read()
+        self.jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1]
+
+    def read(self):
+        self.camera.grab()
+        return True, cv2.imdecode(self.jpeg, cv2.IMREAD_COLOR)
+
+
+def benchmark(seconds=5.0, width=1920, height=1080):
+    """CPU use of the old full-rate preview loop against LivePreview, on a 30 fps fake MJPG camera."""
+    real_imshow, real_wait_key = cv2.imshow, cv2.waitKey
+
+    def imshow(name, frame):
+        # Headless stand-in for the window: a copy of what would be drawn
+        frame.copy()
+
+    def wait_key(delay):
+        time.sleep(delay / 1000)
+        return -1
+
+    cv2.imshow, cv2.waitKey = imshow, wait_key
+    try:
+        cap = _MjpegCamera(width, height)
+        started, cpu_started = time.monotonic(), time.process_time()
+        frames = 0
+        while time.monotonic() - started < seconds:
+            ret, frame = cap.read()
+            cv2.imshow("old", frame)
+            cv2.waitKey(1)
+            frames += 1
+        old_cpu = 100 * (time.process_time() - cpu_started) / (time.monotonic() - started)
+        print(f"Old loop: {frames / seconds:.1f} fps, {old_cpu:.1f}% of one CPU core")
+
+        preview = LivePreview("new")
+        deadline = time.monotonic() + seconds
+        cv2.waitKey = lambda delay: wait_key(delay) if time.monotonic() < deadline else ord("q")
+        preview.run(cap)
+        print(preview.summary())
+    finally:
+        cv2.imshow, cv2.waitKey = real_imshow, real_wait_key
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,134 @@
+# Drift-free capture timing shared by the capture scripts.
+#
+# Calling time.sleep(interval) after each capture means the time spent reading
+# the camera, drawing the overlay and writing the JPG is added to every
+# period, so after an hour the "60 mins" frame is really taken at 61 or 62.
+# Instead, every capture has a fixed deadline measured from the start of the
+# session on the monotonic clock, and we sleep until that deadline.
+#
+# If a capture overruns so badly that the next deadline has already passed,
+# the scheduler either skips the missed slots ("skip") or fires them back to
+# back to catch up ("catch_up"). Each capture's lateness (jitter) is recorded.
+
+import time
+from collections import namedtuple
+
+# index:   position in the schedule (0 for the first capture)
+# offset:  planned seconds since the start of the session
+# elapsed: actual seconds since the start of the session when it fired
+# jitter:  elapsed - offset, i.e. how late the capture fired
+Tick = namedtuple("Tick", ["index", "offset", "elapsed", "jitter"])
+
+OVERRUN_POLICIES = ("skip", "catch_up")
+
+
+# --- Schedules (generators of capture offsets in seconds) ---
+def fixed_interval(interval, first=0.0):
+    """A capture at `first` seconds, then one every `interval` seconds."""
+    index = 0
+    while True:
+        yield first + index * interval
+        index += 1
+
+
+def ramp(first_offsets, then_every):
+    """Captures at each of `first_offsets`, then one every `then_every` seconds after the last."""
+    offset = 0.0
+    for offset in first_offsets:
+        yield offset
+    while True:
+        offset += then_every
+        yield offset
+
+
+# --- Scheduler ---
+class CaptureScheduler:
+    """
+    Sleeps until each deadline of a schedule and reports how late it woke.
+
+    Usage:
+        scheduler = CaptureScheduler(ramp([1, 60, 300], 300))
+        while True:
+            tick = scheduler.wait()
+            ... capture ...
+    """
+
+    def __init__(self, offsets, overrun="skip", clock=time.monotonic, sleep=time.sleep):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy: {overrun}")
+        self.overrun = overrun
+        self.clock = clock
+        self.sleep = sleep
+        self.start = clock()
+        self.skipped = 0
+        self.jitters = []
+        self._offsets = iter(offsets)
+        self._index = -1
+        self._current_offset = None
+        self._next_offset = next(self._offsets)
+        self._retry = None
+
+    @property
+    def next_offset(self):
+        """Planned seconds since the start of the session for the next capture."""
+        return self._next_offset
+
+    @property
+    def retrying(self):
+        """True if the next wait() will repeat the current slot (see retry())."""
+        return self._retry is not None
+
+    def seconds_until_next(self):
+        """Seconds left until the next deadline (negative if it has already passed)."""
+        return self.start + self._next_offset - self.clock()
+
+    def wait(self):
+        """Sleeps until the next deadline and returns its Tick."""
+        if self._retry is not None:
+            # Same slot again after a failed capture: fire straight away
+            index, offset = self._retry
+            self._retry = None
+            return self._tick(index, offset)
+
+        offset = self._advance()
+        if self.overrun == "skip":
+            # Drop every slot whose successor is already due, keep the latest one
+            while self.start + self._next_offset <= self.clock():
+                self.skipped += 1
+                offset = self._advance()
+
+        while True:
+            remaining = self.start + offset - self.clock()
+            if remaining <= 0:
+                break
+            self.sleep(remaining)
+        return self._tick(self._index, offset)
+
+    def retry(self):
+        """Makes the next wait() return the current slot again, e.g. after a failed camera read."""
+        # The failed attempt didn't produce a frame, so its timing doesn't count
+        if self.jitters:
+            self.jitters.pop()
+        self._retry = (self._index, self._current_offset)
+
+    def summary(self):
+        """Returns a one-line timing report for the end of the session."""
+        if not self.jitters:
+            return "Timing: no captures."
+        mean_ms = 1000 * sum(self.jitters) / len(self.jitters)
+        max_ms = 1000 * max(self.jitters)
+        return (f"Timing: {len(self.jitters)} captures, jitter mean {mean_ms:.1f} ms, "
+                f"max {max_ms:.1f} ms, {self.skipped} slots skipped.")
+
+    # --- Internals ---
+    def _advance(self):
+        self._index += 1
+        self._current_offset = self._next_offset
+        self._next_offset = next(self._offsets)
+        return self._current_offset
+
+    def _tick(self, index, offset):
+        elapsed = self.clock() - self.start
+        jitter = elapsed - offset
+        self.jitters.append(jitter)
+        return Tick(index, offset, elapsed, jitter)
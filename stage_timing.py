@@ -0,0 +1,203 @@
+# Per-stage timing histograms for the capture loop.
+#
+# When a sit ends up with late or missing photos, the "[n] Captured ..." lines
+# don't say why. StageTimings records how long each stage took (camera read,
+# overlay, JPEG encode, disk write, oversleep past the deadline, retries) into
+# fixed-bucket histograms: recording is a bisect and three additions, and
+# memory stays the same however long the session runs.
+#
+# At shutdown, summary() gives a table per stage. During long runs,
+# maybe_export() writes a snapshot every so often, as JSON or as a Prometheus
+# textfile (node_exporter's textfile collector picks up *.prom files).
+#
+# Pass NULL_TIMINGS wherever timings are optional: every method is a no-op,
+# so disabled instrumentation costs a method call and nothing else.
+#
+# Required libraries: none
+
+import bisect
+import json
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds, in seconds (Prometheus "le" labels)
+BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0,
+           float("inf"))
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their count, sum and maximum."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimates the q-th quantile by interpolating within its bucket, like Prometheus' histogram_quantile."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.counts):
+            if count and seen + count >= target:
+                if bound == float("inf"):
+                    return self.max
+                return min(lower + (bound - lower) * (target - seen) / count, self.max)
+            seen += count
+            lower = bound
+        return self.max
+
+
+class _Stage:
+    """Times a `with` block into one histogram."""
+
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.started)
+
+
+class StageTimings:
+    """
+    Thread-safe named histograms.
+
+        with timings.stage("encode"):
+            ...
+        timings.record("oversleep", tick.jitter)
+    """
+
+    def __init__(self, export_path=None, export_every=60.0):
+        self.export_path = export_path
+        self.export_every = export_every
+        self.histograms = {}
+        self.started = time.monotonic()
+        self._last_export = time.monotonic()
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(max(0.0, seconds))
+
+    # --- Reporting ---
+    def summary(self):
+        if not self.histograms:
+            return "Stage timings: nothing recorded."
+        lines = [f"{'Stage timings':<16}{'count':>8}{'mean':>11}{'p50':>11}{'p95':>11}{'max':>11}"]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                lines.append(f"{name:<16}{h.count:>8}{_ms(h.total / h.count):>11}{_ms(h.quantile(0.5)):>11}"
+                             f"{_ms(h.quantile(0.95)):>11}{_ms(h.max):>11}")
+        return "\n".join(lines)
+
+    def snapshot(self):
+        """All histograms as plain data (what export() writes as JSON)."""
+        with self._lock:
+            return {
+                "uptime_s": round(time.monotonic() - self.started, 3),
+                "stages": {
+                    name: {
+                        "count": h.count,
+                        "sum_s": h.total,
+                        "max_s": h.max,
+                        "buckets": {("+Inf" if bound == float("inf") else repr(bound)): count
+                                    for bound, count in zip(BUCKETS, h.counts)},
+                    }
+                    for name, h in self.histograms.items()
+                },
+            }
+
+    def prometheus(self):
+        """All histograms in the Prometheus text exposition format."""
+        lines = ["# HELP timelapse_stage_seconds Time spent in each capture stage.",
+                 "# TYPE timelapse_stage_seconds histogram"]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'timelapse_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'timelapse_stage_seconds_sum{{stage="{name}"}} {h.total}')
+                lines.append(f'timelapse_stage_seconds_count{{stage="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Writes a snapshot to `path` (.prom = Prometheus textfile, anything else = JSON), atomically."""
+        path = path or self.export_path
+        if not path:
+            return
+        content = self.prometheus() if path.endswith(".prom") else json.dumps(self.snapshot(), indent=2)
+        # Write then rename, so a collector never reads a half-written file
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            f.write(content)
+        os.replace(temporary, path)
+        self._last_export = time.monotonic()
+
+    def maybe_export(self):
+        """Exports if export_path is set and export_every seconds have passed since the last export."""
+        if self.export_path and time.monotonic() - self._last_export >= self.export_every:
+            self.export()
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f} ms"
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+class NullTimings:
+    """StageTimings that records nothing."""
+
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def record(self, name, seconds):
+        pass
+
+    def summary(self):
+        return "Stage timings: off."
+
+    def export(self, path=None):
+        pass
+
+    def maybe_export(self):
+        pass
+
+
+NULL_TIMINGS = NullTimings()
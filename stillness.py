@@ -0,0 +1,187 @@
+# A measured stillness score, to stamp on the photos instead of made-up numbers.
+#
+# Between photos the camera is sampled about once a second. Each sample is
+# shrunk to a tiny grayscale copy (64 pixels wide) and compared with the
+# previous one:
+#
+#   motion    - mean absolute difference in brightness (0-255), minus a small
+#               allowance for camera noise
+#   flow      - optional: mean optical-flow magnitude (Farneback) on the same
+#               tiny copies, in thumbnail pixels per sample
+#
+# A sample counts as "moved" if either goes over its threshold. The overlay
+# shows how still the sitter was over the interval since the last photo, and
+# the same numbers go into the session's frame manifest.
+#
+# With the camera switched off between photos there is nothing to sample, so
+# the photos themselves are the samples: each is compared with the one before
+# (photo_change_lines() is the overlay for that).
+#
+# Everything runs on the tiny copy, so a sample costs well under a millisecond.
+# Each sample is timed against SAMPLE_BUDGET_MS; if optical flow keeps pushing
+# samples over it (BUDGET_STRIKES in a row, so one hiccup doesn't count), flow
+# is switched off for the rest of the session.
+#
+# Benchmark the per-sample cost with: python stillness.py
+#
+# Required libraries: opencv-python, NumPy
+
+import cv2
+import numpy as np
+import time
+
+THUMBNAIL_WIDTH = 64
+NOISE_FLOOR = 1.0        # Mean difference camera noise alone produces (0-255)
+MOTION_THRESHOLD = 2.0   # Mean difference above the noise floor that counts as movement
+FLOW_THRESHOLD = 0.3     # Mean optical flow (thumbnail pixels) that counts as movement
+SAMPLE_PERIOD_S = 1.0    # How often the camera is sampled between photos
+SAMPLE_BUDGET_MS = 2.0   # Hard CPU-time budget per sample
+BUDGET_STRIKES = 3       # Samples in a row over budget before optical flow is dropped
+
+
+def tiny_gray(frame, width=THUMBNAIL_WIDTH):
+    """A `width`-pixel-wide grayscale copy of a BGR frame (shrunk first, so the colour conversion is nearly free)."""
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    # Averaging every pixel of a 1080p frame costs ~2 ms; pick a 4x grid of
+    # pixels first, then average that (4x4 pixels per thumbnail pixel)
+    if frame.shape[1] > width * 4:
+        frame = cv2.resize(frame, (width * 4, height * 4), interpolation=cv2.INTER_NEAREST)
+    small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+
+class StillnessMeter:
+    """
+    Scores how still the sitter is from frames sampled between photos.
+
+    Call sample(frame) on every sampled frame (or watch() to do the sampling),
+    then interval() when a photo is taken to get and reset the interval's numbers.
+    """
+
+    def __init__(self, optical_flow=False, budget_ms=SAMPLE_BUDGET_MS):
+        self.optical_flow = optical_flow
+        self.budget_ms = budget_ms
+        self.sample_times = []  # milliseconds per sample, whole session
+        self.over_budget = 0
+        self._strikes = 0
+        self.still_since = None  # monotonic time of the first still sample since the last movement
+        self._previous = None
+        self._motions = []
+        self._flows = []
+        self._moved = 0
+
+    # --- Sampling ---
+    def sample(self, frame, now=None):
+        """Scores one frame against the previous sample. Returns True if it moved."""
+        started = time.thread_time()
+        now = time.monotonic() if now is None else now
+        gray = tiny_gray(frame)
+        moved = False
+        if self._previous is not None and self._previous.shape == gray.shape:
+            difference = cv2.absdiff(gray, self._previous)
+            motion = max(0.0, float(difference.mean()) - NOISE_FLOOR)
+            self._motions.append(motion)
+            moved = motion > MOTION_THRESHOLD
+            if self.optical_flow:
+                flow = cv2.calcOpticalFlowFarneback(self._previous, gray, None, 0.5, 2, 9, 2, 5, 1.1, 0)
+                magnitude = float(np.sqrt((flow * flow).sum(axis=2)).mean())
+                self._flows.append(magnitude)
+                moved = moved or magnitude > FLOW_THRESHOLD
+            if moved:
+                self._moved += 1
+        self._previous = gray
+        if moved or self.still_since is None:
+            self.still_since = now
+
+        # CPU time of this thread, so time spent waiting for the grabber thread doesn't count
+        elapsed_ms = (time.thread_time() - started) * 1000
+        self.sample_times.append(elapsed_ms)
+        if elapsed_ms <= self.budget_ms:
+            self._strikes = 0
+        else:
+            self.over_budget += 1
+            self._strikes += 1
+            if self.optical_flow and self._strikes >= BUDGET_STRIKES:
+                self.optical_flow = False
+                print(f"⚠️ Stillness sample took {elapsed_ms:.1f} ms (budget {self.budget_ms} ms); "
+                      f"optical flow switched off.")
+        return moved
+
+    def watch(self, cap, seconds_left, period=SAMPLE_PERIOD_S):
+        """Samples `cap` every `period` seconds until seconds_left() is less than one period."""
+        while seconds_left() > period:
+            ret, frame = cap.read()
+            if ret:
+                self.sample(frame)
+            time.sleep(max(0.0, min(period, seconds_left() - period)))
+
+    # --- Results ---
+    def interval(self, now=None):
+        """
+        The numbers for the samples since the last call, then starts a new interval:
+        stillness (% of samples without movement), motion (mean and peak), flow
+        (mean, or None), samples, and still_minutes (time since the last movement).
+        """
+        now = time.monotonic() if now is None else now
+        samples = len(self._motions)
+        result = {
+            "stillness": round(100.0 * (samples - self._moved) / samples) if samples else None,
+            "motion": round(float(np.mean(self._motions)), 2) if samples else None,
+            "motion_peak": round(max(self._motions), 2) if samples else None,
+            "flow": round(float(np.mean(self._flows)), 3) if self._flows else None,
+            "samples": samples,
+            "still_minutes": int((now - self.still_since) // 60) if self.still_since is not None else 0,
+        }
+        self._motions = []
+        self._flows = []
+        self._moved = 0
+        return result
+
+    def summary(self):
+        if not self.sample_times:
+            return "Stillness: no samples."
+        times = np.asarray(self.sample_times)
+        return (f"Stillness: {len(times)} samples, {np.median(times):.2f} ms median, "
+                f"{times.max():.2f} ms max, {self.over_budget} over the {self.budget_ms} ms budget.")
+
+
+def overlay_lines(result):
+    """The overlay text for one interval's numbers."""
+    if result["stillness"] is None:
+        return ["Stillness: measuring..."]
+    return [
+        f"Stillness: {result['stillness']}%",
+        f"Motion: {result['motion']:.1f} (peak {result['motion_peak']:.1f})",
+        f"Still for: {result['still_minutes']} min" + ("" if result['still_minutes'] == 1 else "s"),
+    ]
+
+
+def photo_change_lines(result):
+    """The overlay text when only the photos are sampled (one sample per interval)."""
+    if result["motion"] is None:
+        return ["Change since last photo: measuring..."]
+    return [
+        f"Change since last photo: {result['motion']:.1f}",
+        f"Still for: {result['still_minutes']} min" + ("" if result['still_minutes'] == 1 else "s"),
+    ]
+
+
+# --- Benchmark ---
+def benchmark(samples=500):
+    """Times sample() on synthetic noisy frames at common webcam sizes, with and without optical flow."""
+    rng = np.random.default_rng(0)
+    for width, height in ((640, 480), (1280, 720), (1920, 1080)):
+        base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        frames = [cv2.add(base, rng.integers(0, 4, base.shape, dtype=np.uint8)) for _ in range(4)]
+        for flow in (False, True):
+            meter = StillnessMeter(optical_flow=flow, budget_ms=float("inf"))
+            for i in range(samples):
+                meter.sample(frames[i % len(frames)])
+            times = np.asarray(meter.sample_times[1:])
+            print(f"{width}x{height} flow={'on ' if flow else 'off'}: median {np.median(times):.3f} ms, "
+                  f"p99 {np.percentile(times, 99):.3f} ms, max {times.max():.3f} ms "
+                  f"(budget {SAMPLE_BUDGET_MS} ms)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,267 @@
+# Fit a timelapse into a byte budget (e.g. a messenger's attachment limit) in one encode.
+#
+# Instead of re-running gif-maker.py with smaller and smaller settings until
+# the file fits, plan() estimates the output size of each candidate setting
+# from a few short stretches of the session and picks the best one that fits.
+# The settings searched are:
+#
+#   width   - frame width in pixels
+#   colors  - palette size (GIFs only)
+#   every   - keep every Nth frame; each kept frame is shown N times as long,
+#             so the timelapse still plays for the same time (up to
+#             MAX_FRAME_DURATION_MS a frame)
+#
+# Candidates are tried best first (resolution matters most, then smoothness,
+# then colours) and the first one whose estimate fits wins.
+#
+# Estimates are cheap because nothing is test-encoded at full size:
+#
+#   - each stretch of SEGMENT_FRAMES consecutive (kept) frames is encoded at
+#     PROBE_WIDTH, once per palette size and decimation. Its first frame costs
+#     what the GIF's first frame costs and the rest what frame-to-frame changes
+#     cost, so the estimate is first frame + average change x (frames - 1).
+#     The stretches go through the same near-duplicate collapsing as the GIF.
+#   - how size grows with width is measured once, by also encoding the
+#     stretches at CALIBRATION_WIDTH, and every width's estimate is the probe
+#     estimate scaled by (width / PROBE_WIDTH) ** that growth exponent
+#
+# Videos are estimated from the whole stretches, key frames included, which
+# overestimates a little (cv2's writer has no bitrate control to aim with).
+#
+# Required libraries: Pillow, NumPy, opencv-python
+
+from PIL import Image
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from frame_loader import iter_frames
+from gif_writer import GifStreamWriter
+from video_writer import VideoStreamWriter
+from palette import GlobalPalette, sample_evenly
+from frame_dedup import NearDuplicateFilter
+
+WIDTHS = (960, 720, 540, 400, 300)
+COLORS = (255, 96)               # 255 leaves an index free for transparent deltas
+EVERY = (1, 2, 3, 4, 6)
+SAMPLE_SEGMENTS = 3              # Stretches of the session that are encoded
+SEGMENT_FRAMES = 8               # Consecutive kept frames per stretch
+PROBE_WIDTH = 240                # Width every candidate is test-encoded at
+CALIBRATION_WIDTH = 480          # Second width, to measure how size grows with width
+SAFETY_MARGIN = 0.9              # Aim for this share of the budget
+MAX_FRAME_DURATION_MS = 1000
+
+
+class Plan:
+    """The settings chosen for a budget, and what they are expected to produce."""
+
+    def __init__(self, width, colors, every, duration_ms, estimated_bytes, fits):
+        self.width = width
+        self.colors = colors
+        self.every = every
+        self.duration_ms = duration_ms
+        self.estimated_bytes = estimated_bytes
+        self.fits = fits
+        self.measured = 0        # test encodes made
+        self.search_seconds = 0.0
+
+    def describe(self):
+        colors = f", {self.colors} colours" if self.colors else ""
+        every = f"every {self.every} frames" if self.every > 1 else "every frame"
+        return (f"{self.width}px{colors}, {every} at {self.duration_ms} ms, "
+                f"estimated {self.estimated_bytes / (1024 * 1024):.2f} MB")
+
+
+def score(width, colors, every):
+    """How good a candidate looks: pixels first, then smoothness, then colours."""
+    value = width * width / math.sqrt(every)
+    if colors:
+        value *= math.log2(colors) / 8
+    return value
+
+
+class TargetSizePlanner:
+    """
+    Searches width, palette size and frame decimation for the best output under
+    `budget_bytes`. `frames` are what gif-maker.py would encode (paths or frame
+    store pairs), in order.
+    """
+
+    def __init__(self, frames, budget_bytes, frame_duration_ms, output_format="gif", workers=None,
+                 exposure=None, cache=None, transparent_deltas=True, delta_tolerance=0, duplicate_threshold=None,
+                 ignore_region=None, widths=WIDTHS, colors=COLORS, every=EVERY):
+        self.frames = list(frames)
+        self.budget_bytes = budget_bytes
+        self.frame_duration_ms = frame_duration_ms
+        self.output_format = output_format
+        self.workers = workers
+        self.exposure = exposure
+        self.cache = cache
+        self.transparent_deltas = transparent_deltas
+        self.delta_tolerance = delta_tolerance
+        self.duplicate_threshold = duplicate_threshold
+        self.ignore_region = ignore_region
+        self.widths = sorted(widths, reverse=True)
+        self.colors = sorted(colors, reverse=True) if output_format == "gif" else [None]
+        self.every = sorted(n for n in every if n == 1 or n < len(self.frames))
+        self.encodes = 0
+        self._decoded = {}    # frame index -> image at CALIBRATION_WIDTH
+        self._resized = {}    # (frame index, width) -> image
+        self._palettes = {}   # colours -> GlobalPalette
+        self._first_frame_bytes = {}  # (width, colours) -> size of a one-frame GIF
+        self._collapsed = {}  # (frame indices, every) -> [(frame index, duration), ...]
+        self._probes = {}     # (colours, every) -> estimate at PROBE_WIDTH
+        self._exponent = None
+        self._workdir = None
+
+    def plan(self):
+        started = time.perf_counter()
+        target = self.budget_bytes * SAFETY_MARGIN
+        candidates = sorted(((w, c, n) for w in self.widths for c in self.colors for n in self.every),
+                            key=lambda candidate: score(*candidate), reverse=True)
+        best = None
+        smallest = None
+        self._workdir = tempfile.mkdtemp(prefix="timelapse_target_")
+        try:
+            for width, colors, every in candidates:
+                size = self.estimate(width, colors, every)
+                if smallest is None or size < smallest[3]:
+                    smallest = (width, colors, every, size, False)
+                if size <= target:
+                    best = (width, colors, every, size, True)
+                    break
+        finally:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+
+        # Nothing fits: fall back to the smallest output
+        width, colors, every, size, fits = best or smallest
+        plan = Plan(width, colors, every, self.duration_for(every), size, fits)
+        plan.measured = self.encodes
+        plan.search_seconds = time.perf_counter() - started
+        return plan
+
+    def duration_for(self, every):
+        return min(self.frame_duration_ms * every, max(self.frame_duration_ms, MAX_FRAME_DURATION_MS))
+
+    # --- Estimating ---
+    def estimate(self, width, colors, every):
+        """Estimated output size in bytes for one candidate."""
+        probe = self._probes.get((colors, every))
+        if probe is None:
+            probe = self._probes[(colors, every)] = self._measure(PROBE_WIDTH, colors, every)
+        return probe * (width / PROBE_WIDTH) ** self._growth()
+
+    def _growth(self):
+        """How size grows with width: size ~ width ** exponent, measured between the two test widths."""
+        if self._exponent is None:
+            colors, every = self.colors[0], self.every[0]
+            probe = self._probes.get((colors, every)) or self._measure(PROBE_WIDTH, colors, every)
+            calibration = self._measure(CALIBRATION_WIDTH, colors, every)
+            exponent = math.log(calibration / probe) / math.log(CALIBRATION_WIDTH / PROBE_WIDTH)
+            # Between linear (all in fixed costs) and the pixel count
+            self._exponent = min(max(exponent, 1.0), 2.0)
+        return self._exponent
+
+    def _measure(self, width, colors, every):
+        """Estimated output size in bytes for a candidate, from test encodes at `width`."""
+        kept = math.ceil(len(self.frames) / every)
+        segments = self._segments(every)
+        self._decode([i for segment in segments for i in segment])
+        if self.output_format != "gif":
+            total = sum(self._encode_video([self._frame(i, width) for i in segment], every) for segment in segments)
+            return total / sum(len(segment) for segment in segments) * kept
+
+        # Every frame of a sit shows the same scene, so one full frame stands
+        # for the first frame of every stretch; the rest of each stretch is change
+        palette = self._palette(colors)
+        first = self._first_frame_bytes.get((width, colors))
+        if first is None:
+            first = self._encode_gif([(self._frame(0, width), self.frame_duration_ms)], palette)
+            self._first_frame_bytes[(width, colors)] = first
+        segment_bytes = [self._encode_gif([(self._frame(i, width), duration)
+                                           for i, duration in self._collapse(segment, every)], palette)
+                         for segment in segments]
+        changes = sum(len(segment) - 1 for segment in segments)
+        change = max(0.0, sum(segment_bytes) - first * len(segments)) / changes if changes else 0.0
+        return first + change * (kept - 1)
+
+    def _segments(self, every):
+        """
+        SAMPLE_SEGMENTS evenly spread runs of SEGMENT_FRAMES kept frames (as
+        indices into frames). Runs start at the same frames whatever `every`
+        is, so different decimations share most of their decoded frames.
+        """
+        span = (SEGMENT_FRAMES - 1) * every
+        last_start = max(0, len(self.frames) - 1 - span)
+        starts = sorted(set(sample_evenly(range(last_start + 1), SAMPLE_SEGMENTS)))
+        return [[i for i in range(start, start + span + 1, every) if i < len(self.frames)] for start in starts]
+
+    def _decode(self, indices):
+        missing = sorted(set(indices) - set(self._decoded))
+        if not missing:
+            return
+        frames = iter_frames([self.frames[i] for i in missing], CALIBRATION_WIDTH, self.workers, self.exposure,
+                             self.cache)
+        for i, frame in zip(missing, frames):
+            self._decoded[i] = frame
+
+    def _frame(self, i, width):
+        frame = self._decoded.get(i)
+        if frame is None:
+            self._decode([i])
+            frame = self._decoded[i]
+        if frame.width == width:
+            return frame
+        resized = self._resized.get((i, width))
+        if resized is None:
+            resized = self._resized[(i, width)] = frame.resize((width, round(frame.height * width / frame.width)),
+                                                               Image.Resampling.LANCZOS)
+        return resized
+
+    def _collapse(self, segment, every):
+        """
+        The segment's frames and durations after near-duplicate collapsing.
+        Which frames collapse doesn't depend on width or colours, so this is
+        worked out once for all candidates.
+        """
+        key = (tuple(segment), every)
+        collapsed = self._collapsed.get(key)
+        if collapsed is None:
+            duration = self.duration_for(every)
+            if self.duplicate_threshold is None:
+                collapsed = [(i, duration) for i in segment]
+            else:
+                index_of = {id(self._decoded[i]): i for i in segment}
+                runs = NearDuplicateFilter(self.duplicate_threshold, self.ignore_region).collapse(
+                    [self._decoded[i] for i in segment], duration)
+                collapsed = [(index_of[id(frame)], run_duration) for frame, run_duration in runs]
+            self._collapsed[key] = collapsed
+        return collapsed
+
+    def _palette(self, colors):
+        palette = self._palettes.get(colors)
+        if palette is None:
+            samples = sample_evenly(sorted(self._decoded), 16)
+            frames = [self._frame(i, PROBE_WIDTH) for i in samples]
+            palette = self._palettes[colors] = GlobalPalette.from_frames(frames, colors)
+        return palette
+
+    def _encode_gif(self, timed, palette):
+        self.encodes += 1
+        path = os.path.join(self._workdir, "sample.gif")
+        transparent = self.transparent_deltas and len(palette.palette) // 3 < 256
+        with GifStreamWriter(path, loop=0, palette=palette, transparent_deltas=transparent,
+                             delta_tolerance=self.delta_tolerance) as gif:
+            for image, duration in timed:
+                gif.append(image, duration=duration)
+        return os.path.getsize(path)
+
+    def _encode_video(self, images, every):
+        self.encodes += 1
+        path = os.path.join(self._workdir, "sample." + self.output_format)
+        with VideoStreamWriter(path, fps=1000 / self.duration_for(every)) as video:
+            for image in images:
+                video.append(image)
+        return os.path.getsize(path)
@@ -3,11 +3,17 @@ import time
 import os
 import random
 
+from scheduler import CaptureScheduler, fixed_interval
+from overlay import OverlayCompositor
+from stillness import StillnessMeter, overlay_lines
+from manifest import SessionManifest
+
 # --- Test Configuration ---
 NUM_PHOTOS = 3
 INTERVAL = 1
 OUTPUT_DIR = "test_images"
 CAMERA_INDEX = 0
+STILLNESS_SAMPLE_PERIOD = 0.2  # Seconds between stillness samples (photos are only a second apart)
 
 # --- Text Overlay Settings ---
 FONT = cv2.FONT_HERSHEY_SIMPLEX
@@ -27,17 +33,12 @@ JOKE_TEXT_START_Y = 280          # Moved down
 JOKE_LINE_SPACING = 60           # Increased spacing
 
 # --- Helper Function ---
+OVERLAY = OverlayCompositor()
+
 def draw_text_with_bg(frame, text, position, font, scale, text_color, bg_color, thickness, padding=3):
     """Draws text with a background rectangle for better legibility."""
-    (text_width, text_height), baseline = cv2.getTextSize(text, font, scale, thickness)
-    x, y = position  # This is the bottom-left corner of the text
-
-    # Calculate rectangle coordinates with padding
-    rect_start = (x - padding, y - text_height - baseline - padding)
-    rect_end = (x + text_width + padding, y + baseline + padding)
-    
-    cv2.rectangle(frame, rect_start, rect_end, bg_color, -1)
-    cv2.putText(frame, text, position, font, scale, text_color, thickness)
+    # position is the bottom-left corner of the text; repeated labels come from cached sprites
+    OVERLAY.draw_label(frame, text, position, font, scale, text_color, bg_color, thickness, padding)
 
 # --- Setup ---
 if not os.path.exists(OUTPUT_DIR):
@@ -51,30 +52,34 @@ if not cap.isOpened():
 
 # --- Pre-Loop Setup ---
 samsara_cycles_this_session = random.randint(999999, 99999999)
+# One row per photo, so the GIF tools pick up this session and not an older one
+manifest = SessionManifest(OUTPUT_DIR)
 
 print(f"Starting session: Taking {NUM_PHOTOS} photos, {INTERVAL} second apart...")
 print(f"This session's remaining Samsara Cycles: {samsara_cycles_this_session}")
 
 # --- Main Loop ---
+scheduler = CaptureScheduler(fixed_interval(INTERVAL))
+meter = StillnessMeter()
 try:
-    start_time = time.time()
     for i in range(NUM_PHOTOS):
         image_count = i + 1
+        meter.watch(cap, scheduler.seconds_until_next, period=STILLNESS_SAMPLE_PERIOD)
+        tick = scheduler.wait()
         
         ret, frame = cap.read()
+        captured_wall, captured_at = time.time(), time.monotonic()
         
         if ret:
+            meter.sample(frame)
+            stillness = meter.interval()
             # 1. Generate text strings
-            elapsed_seconds = int(time.time() - start_time)
+            elapsed_seconds = int(tick.elapsed)
             elapsed_text = f"Time Elapsed: {elapsed_seconds}s"
             timestamp_text = time.strftime("%Y-%m-%d %H:%M:%S")
             samsara_text = f"Samsara Cycles Left: {samsara_cycles_this_session}"
-            concentration_value = int(random.triangular(0, 100, 15))
-            concentration_text = f"Concentration: {concentration_value}%"
-            dukkha_text = f"Dukkha (Stress): {random.randint(20, 80)}%"
-            moha_text = f"Moha (Delusion): {random.randint(40, 95)}%"
-            tanha_text = f"Tanha (Grasping): {random.randint(10, 70)}%"
-            dosa_text = f"Dosa (Aversion): {random.randint(10, 70)}%"
+            # Measured between photos, not made up
+            stillness_texts = overlay_lines(stillness)
             
             # 2. Draw all text using the helper function
             draw_text_with_bg(frame, elapsed_text, ELAPSED_TEXT_POSITION, FONT, PRIMARY_FONT_SCALE, FONT_COLOR, BG_COLOR, PRIMARY_FONT_THICKNESS)
@@ -83,25 +88,19 @@ try:
             # Joke info
             joke_y = JOKE_TEXT_START_Y
             draw_text_with_bg(frame, samsara_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
-            joke_y += JOKE_LINE_SPACING
-            draw_text_with_bg(frame, concentration_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
-            joke_y += JOKE_LINE_SPACING
-            draw_text_with_bg(frame, dukkha_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
-            joke_y += JOKE_LINE_SPACING
-            draw_text_with_bg(frame, moha_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
-            joke_y += JOKE_LINE_SPACING
-            draw_text_with_bg(frame, tanha_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
-            joke_y += JOKE_LINE_SPACING
-            draw_text_with_bg(frame, dosa_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
+            for stillness_text in stillness_texts:
+                joke_y += JOKE_LINE_SPACING
+                draw_text_with_bg(frame, stillness_text, (20, joke_y), FONT, JOKE_FONT_SCALE, FONT_COLOR, BG_COLOR, JOKE_FONT_THICKNESS)
 
             # 3. Save the modified frame
             file_timestamp = time.strftime("%Y%m%d-%H%M%S")
             filename = os.path.join(OUTPUT_DIR, f"meditation_log_{file_timestamp}.jpg")
             cv2.imwrite(filename, frame)
+            manifest.append(file=os.path.basename(filename), wall=captured_wall, monotonic=captured_at,
+                            elapsed=captured_at - scheduler.start, size=os.path.getsize(filename))
             
-            print(f"[{image_count}/{NUM_PHOTOS}] Captured {filename}")
-            
-            time.sleep(max(0, INTERVAL - (time.time() - start_time) % INTERVAL))
+            print(f"[{image_count}/{NUM_PHOTOS}] Captured {filename} ({tick.jitter * 1000:+.0f} ms, "
+                  f"{stillness['samples']} stillness samples: {', '.join(stillness_texts)})")
         else:
             print("Failed to capture frame.")
             break
@@ -113,4 +112,7 @@ finally:
     # --- Cleanup ---
     cap.release()
     cv2.destroyAllWindows()
+    manifest.close()
+    print(scheduler.summary())
+    print(meter.summary())
     print("Webcam released.")
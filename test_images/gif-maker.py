@@ -1,35 +1,49 @@
-from PIL import Image
 import glob
-import time
+import os
+import sys
+
+# Shared helpers (frame_loader.py etc.) live in the repo root, one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_loader import iter_frames
+from manifest import find_frames
 
 # --- Configuration ---
 # Duration of each frame in the GIF, in milliseconds.
 # 1000ms = 1 second. 200ms is a good speed for a 10-frame test.
-FRAME_DURATION_MS = 200 
+FRAME_DURATION_MS = 200
 OUTPUT_FILENAME = "output_timelapse.gif"
+# Width of the GIF in pixels (None = full webcam resolution, no resizing)
+RESIZE_WIDTH = None
+# Number of processes used to decode and resize the photos (None = one per CPU core)
+DECODE_WORKERS = None
+# Which test run to use, read from the frame manifest test.py writes in sessions/:
+# a session id like "20250101-093000" or "latest". Folders without a manifest
+# fall back to every .jpg in the folder.
+SESSION = "latest"
 
 # --- Main Script ---
-# Generate a timestamp for the output filename
-timestamp = time.strftime("%Y%m%d-%H%M%S")
-output_filename = f"output_timelapse_{timestamp}.gif"
-
-print("Searching for .jpg files in this directory...")
+def main():
+    filenames = find_frames(".", SESSION)
+    if filenames is not None:
+        print(f"Using the frames of session '{SESSION}' from the frame manifest...")
+    else:
+        print("No frame manifest found. Searching for .jpg files in this directory...")
+        # Find all files ending with .jpg and sort them.
+        # The sorting works because your filenames have timestamps.
+        filenames = sorted(glob.glob('*.jpg'))
 
-# Find all files ending with .jpg and sort them.
-# The sorting works because your filenames have timestamps.
-filenames = sorted(glob.glob('*.jpg'))
+    if not filenames:
+        print("❌ No .jpg files found. Please place this script in the folder with your images.")
+        return
 
-if not filenames:
-    print("❌ No .jpg files found. Please place this script in the folder with your images.")
-else:
     print(f"Found {len(filenames)} images. Creating GIF...")
-    
-    # Open all images and store them in a list
-    images = [Image.open(f) for f in filenames]
-    
+
+    # Decode (and shrink) all images in parallel, keeping them in order
+    images = list(iter_frames(filenames, RESIZE_WIDTH, DECODE_WORKERS))
+
     # The first image is the base
     first_image = images[0]
-    
+
     # Save the first image as a GIF, and append the rest
     first_image.save(
         OUTPUT_FILENAME,
@@ -39,6 +53,8 @@ else:
         duration=FRAME_DURATION_MS,
         loop=0 # 0 means the GIF will loop indefinitely
     )
-    
+
     print(f"✨ Success! GIF created: {OUTPUT_FILENAME}")
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Makes one image of evenly spaced frames from the latest sit, each labelled
+# with the minutes into the sit and the time it was taken. Often all your
+# friends need to see, and far quicker to make (and to open) than a GIF.
+#
+# Uses the frame manifest main.py writes, like gif-maker.py; folders without
+# one fall back to every .jpg in the folder (tiles are then unlabelled, but
+# the stamp on each photo is still there).
+#
+# Required libraries: Pillow, NumPy, opencv-python
+
+import glob
+import os
+import sys
+import time
+
+# Shared helpers (contact_sheet.py etc.) live in the repo root, one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from contact_sheet import render_contact_sheet, save_sheet, label_text
+from manifest import find_rows, row_frame
+from palette import sample_evenly
+
+# --- Configuration ---
+SHEET_FRAMES = 48          # How many evenly spaced frames to show (None = every frame)
+TILE_WIDTH = 240           # Width of each frame on the sheet, in pixels
+COLUMNS = None             # None = as many as make the sheet roughly 4:3
+OUTPUT_FORMAT = "jpg"      # "jpg", or "png" for a lossless (much bigger) sheet
+JPEG_QUALITY = 85
+# Same as in gif-maker.py
+SESSION = "latest"
+START_MINUTE = None
+END_MINUTE = None
+CAMERA = "first"
+EXPOSURE = None
+DECODE_WORKERS = None      # Threads decoding the photos (None = one per CPU core)
+
+# --- Main Script ---
+def main():
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    output_filename = f"contact_sheet_{timestamp}.{OUTPUT_FORMAT}"
+
+    start = START_MINUTE * 60 if START_MINUTE is not None else None
+    end = END_MINUTE * 60 if END_MINUTE is not None else None
+    rows = find_rows(".", SESSION, start, end, CAMERA)
+    if rows is not None:
+        print(f"Using the frames of session '{SESSION}' from the frame manifest...")
+        rows = sample_evenly(rows, SHEET_FRAMES) if SHEET_FRAMES else rows
+        frames = [row_frame(".", row) for row in rows]
+        labels = [label_text(row) for row in rows]
+    else:
+        print(f"No frame manifest found. Searching for .jpg files in this directory...")
+        frames = sorted(glob.glob('*.jpg'))
+        frames = sample_evenly(frames, SHEET_FRAMES) if SHEET_FRAMES else frames
+        labels = None
+
+    if not frames:
+        print("❌ No .jpg files found. Please place this script in the folder with your images.")
+        return
+
+    print(f"Tiling {len(frames)} frames at {TILE_WIDTH}px wide...")
+    start_time = time.time()
+    canvas = render_contact_sheet(frames, labels, TILE_WIDTH, COLUMNS, DECODE_WORKERS, EXPOSURE)
+    save_sheet(canvas, output_filename, JPEG_QUALITY)
+
+    file_size_mb = os.path.getsize(output_filename) / (1024 * 1024)
+    print(f"✨ Success! Contact sheet created: {output_filename} ({canvas.shape[1]}x{canvas.shape[0]}, "
+          f"{file_size_mb:.2f} MB) in {time.time() - start_time:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,40 @@
 # A script to increase the exposure of all JPG images in a folder.
-# It processes files in alphabetical order.
+# It processes the latest session's photos in capture order (from the frame
+# manifest main.py writes), or every JPG in alphabetical order if there is none.
 # It prompts the user for an exposure factor, then creates new, brighter images.
 # The original images are not modified.
 #
-# Required library: Pillow
-# Install it using: pip install Pillow
+# Tip: if you only want a brighter GIF, set EXPOSURE in gif-maker.py instead.
+# It brightens each frame while building the GIF, with no extra JPGs on disk.
+#
+# Required libraries: Pillow, NumPy
+# Install them using: pip install Pillow numpy
 
-from PIL import Image, ImageEnhance
 import glob
 import os
+import sys
+
+# Shared helpers (exposure_lut.py etc.) live in the repo root, one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exposure_lut import apply_exposure
+from manifest import find_frames
+from frame_loader import open_image, frame_name
 
 def increase_exposure_sorted():
     """
-    Finds all .jpg files in the current directory, sorts them alphabetically,
-    asks for an exposure factor, and saves new, brighter versions.
+    Finds the latest session's photos (or every .jpg in the current directory,
+    sorted alphabetically, if there is no frame manifest), asks for an
+    exposure factor, and saves new, brighter versions.
     """
     # --- 1. Get User Input for Exposure Factor ---
     exposure_factor = 0.0
     while True:
         try:
             # Prompt the user for the desired increase
-            value = input("Enter the exposure increase factor (e.g., 1.5 for 50% brighter): ")
+            value = input("Enter the exposure increase factor (e.g., 1.5 for 50% brighter, or 'auto'): ")
+            if value.strip().lower() == "auto":
+                exposure_factor = "auto"
+                break
             exposure_factor = float(value)
             if exposure_factor <= 1.0:
                 print("⚠️ Please enter a factor greater than 1.0 to increase brightness.")
@@ -31,16 +45,17 @@ def increase_exposure_sorted():
 
     # --- 2. Find all JPG files in the directory ---
     print("\nSearching for images...")
-    image_paths = glob.glob('*.jpg') + glob.glob('*.JPG')
-
-    # --- NEW: Sort the list of files alphabetically ---
-    image_paths.sort()
+    # The latest session's photos, in capture order, if main.py left a frame manifest
+    image_paths = find_frames(".", "latest")
+    if image_paths is None:
+        # On case-insensitive file systems both patterns match the same files
+        image_paths = sorted(set(glob.glob('*.jpg') + glob.glob('*.JPG')))
 
     if not image_paths:
         print("No JPG files found in this folder. Exiting.")
         return
 
-    print(f"Found {len(image_paths)} JPG files. Processing in alphabetical order.")
+    print(f"Found {len(image_paths)} JPG files. Processing them in order.")
 
     # --- 3. Process each image ---
     # Counter for the new filenames
@@ -48,22 +63,22 @@ def increase_exposure_sorted():
     for image_path in image_paths:
         try:
             # Open the image file
-            with Image.open(image_path) as img:
-                # Use ImageEnhance.Brightness to adjust exposure
-                enhancer = ImageEnhance.Brightness(img)
-                img_enhanced = enhancer.enhance(exposure_factor)
+            with open_image(image_path) as img:
+                # Brighten with a precomputed lookup table (same result as
+                # ImageEnhance.Brightness, applied in one pass)
+                img_enhanced = apply_exposure(img.convert("RGB"), exposure_factor)
 
                 # Define the new filename: n-[exposure_amount].jpg
                 new_filename = f"{image_count}-{exposure_factor}.jpg"
 
                 # Save the new, brighter image
                 img_enhanced.save(new_filename)
-                print(f"✅ Processed '{image_path}' -> Saved as '{new_filename}'")
+                print(f"✅ Processed '{frame_name(image_path)}' -> Saved as '{new_filename}'")
 
                 image_count += 1
 
         except Exception as e:
-            print(f"❌ Could not process '{image_path}'. Error: {e}")
+            print(f"❌ Could not process '{frame_name(image_path)}'. Error: {e}")
 
     print("\n✨ All images processed successfully!")
 
@@ -1,48 +1,186 @@
-from PIL import Image
 import glob
 import time
 import os
+import sys
+
+# Shared helpers (gif_writer.py etc.) live in the repo root, one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gif_writer import GifStreamWriter, split_long_frames
+from video_writer import VideoStreamWriter
+from frame_loader import iter_frames, default_workers
+from palette import GlobalPalette, sample_evenly
+from manifest import find_frames
+from frame_dedup import NearDuplicateFilter
+from frame_cache import FrameCache
+from target_size import TargetSizePlanner
 
 # --- Configuration ---
 FRAME_DURATION_MS = 200
 # Add a new configuration section for resizing
 RESIZE_WIDTH = 960 # Set the desired width in pixels
+# Streaming mode decodes, resizes and writes one frame at a time, so memory
+# stays flat however many photos the sit produced. Set to False to build the
+# GIF the old way (every resized frame held in memory, then saved at once).
+# Note: GLOBAL_PALETTE, COLLAPSE_DUPLICATES and TRANSPARENT_DELTAS below are
+# on by default and each changes the output (colours, frame count, pixels).
+# With all three set to False, streaming mode writes the same GIF as the old
+# way, pixel for pixel and with the same frame timings.
+STREAMING_MODE = True
+# Global palette mode builds one colour palette from a sample of the frames and
+# maps every frame to it with a fast lookup table, instead of quantizing each
+# frame separately. Much faster, and stops the colours flickering between frames.
+# Output differs from per-frame palettes: every frame uses the shared colours.
+GLOBAL_PALETTE = True
+PALETTE_SAMPLE_FRAMES = 16 # How many evenly spaced frames the palette is built from
+PALETTE_COLORS = 256
+# Exposure correction applied while the frames are loaded (no need to run
+# exposure.py first): None = off, a factor like 1.5 = 50% brighter, or "auto"
+# to brighten each frame based on how dark it is
+EXPOSURE = None
+# Number of processes used to decode and resize the photos (None = one per CPU core)
+DECODE_WORKERS = None
+# Which photos to use, read from the frame manifest main.py writes in sessions/.
+# SESSION is a session id like "20250101-093000" or "latest". START_MINUTE and
+# END_MINUTE cut a time range out of the session (None = from the start / to the end).
+# Folders without a manifest fall back to every .jpg in the folder.
+SESSION = "latest"
+START_MINUTE = None
+END_MINUTE = None
+# For sessions that saved several cameras as separate streams: which camera to
+# use (its index, or "first")
+CAMERA = "first"
+# Output format: "gif", or "mp4" / "webm" for a video that is many times smaller
+# and faster to make (sits barely change from frame to frame, which video
+# codecs store almost for free). Most chat apps play both inline.
+OUTPUT_FORMAT = "gif"
+VIDEO_CODEC = None                    # FourCC like "mp4v", "VP80", "VP90" or "avc1" (None = default for the format)
+VIDEO_FPS = 1000 / FRAME_DURATION_MS  # Same speed as the GIF
+# Near-duplicate collapsing: a run of frames where you didn't move becomes one
+# frame shown for the whole run, so a still sit makes a small GIF. The overlay
+# clock then jumps ahead at the end of each still stretch. Output differs: fewer,
+# longer frames, and small movements below the threshold are not shown.
+COLLAPSE_DUPLICATES = True
+DUPLICATE_THRESHOLD = 0.005  # Share of the picture that must change to start a new frame
+# Part of the frame ignored when comparing (left, top, right, bottom as fractions),
+# so the ticking overlay never counts as movement. Fits main.py's bars on a 720p
+# webcam; use (0.0, 0.0, 0.7, 0.85) for every-5-mins.py's taller overlay.
+OVERLAY_REGION = (0.0, 0.0, 0.6, 0.3)
+# Store only the pixels that changed since the previous frame (the rest are
+# transparent). Needs GLOBAL_PALETTE; costs one palette colour. Lossy: changes
+# within DELTA_TOLERANCE are not drawn, so pixels can differ from the photos by
+# up to that much (set DELTA_TOLERANCE = 0 to keep every change).
+TRANSPARENT_DELTAS = True
+DELTA_TOLERANCE = 24  # Colour change (0-255 per channel) still treated as camera noise
+# Keep the resized (and exposure-corrected) frames on disk between runs, so a
+# rebuild after new photos or a change of speed, palette or format only decodes
+# the photos it hasn't seen with these settings. Least recently used frames are
+# deleted once the cache outgrows FRAME_CACHE_MAX_MB.
+FRAME_CACHE = True
+FRAME_CACHE_DIR = ".frame_cache"
+FRAME_CACHE_MAX_MB = 2048
+# Make the output fit a size limit (e.g. 8 for an 8 MB attachment limit; None = off).
+# Width, palette size, how many frames to keep and how long each is shown are
+# chosen from test encodes of a few short stretches, then the file is made
+# once. Overrides RESIZE_WIDTH, PALETTE_COLORS, FRAME_DURATION_MS and VIDEO_FPS
+# (the timelapse keeps its length), and always streams with a global palette.
+TARGET_SIZE_MB = None
 
 # --- Main Script ---
-timestamp = time.strftime("%Y%m%d-%H%M%S")
-output_filename = f"output_timelapse_{timestamp}.gif"
-
-print(f"Searching for .jpg files in this directory...")
-filenames = sorted(glob.glob('*.jpg'))
-
-if not filenames:
-    print("❌ No .jpg files found. Please place this script in the folder with your images.")
-else:
-    print(f"Found {len(filenames)} images. Creating GIF...")
-    
-    images = []
-    print(f"Resizing images to a width of {RESIZE_WIDTH}px...")
-    for f in filenames:
-        img = Image.open(f)
-        # Calculate new height to maintain the original aspect ratio
-        aspect_ratio = float(img.size[1]) / float(img.size[0])
-        new_height = int(aspect_ratio * RESIZE_WIDTH)
-        # Resize the image using a high-quality filter
-        img_resized = img.resize((RESIZE_WIDTH, new_height), Image.Resampling.LANCZOS)
-        images.append(img_resized)
-    
-    first_image = images[0]
-    
-    print(f"Saving GIF as {output_filename}...")
-    first_image.save(
-        output_filename,
-        save_all=True,
-        append_images=images[1:],
-        optimize=True,  # <-- Set to True for smaller file size
-        duration=FRAME_DURATION_MS,
-        loop=0
-    )
-    
+def main():
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    output_filename = f"output_timelapse_{timestamp}.{OUTPUT_FORMAT}"
+
+    start = START_MINUTE * 60 if START_MINUTE is not None else None
+    end = END_MINUTE * 60 if END_MINUTE is not None else None
+    filenames = find_frames(".", SESSION, start, end, CAMERA)
+    if filenames is not None:
+        print(f"Using the frames of session '{SESSION}' from the frame manifest...")
+    else:
+        print(f"No frame manifest found. Searching for .jpg files in this directory...")
+        filenames = sorted(glob.glob('*.jpg'))
+
+    if not filenames:
+        print("❌ No .jpg files found. Please place this script in the folder with your images.")
+        return
+
+    workers = DECODE_WORKERS or default_workers()
+    start_time = time.time()
+    deduplicator = NearDuplicateFilter(DUPLICATE_THRESHOLD, OVERLAY_REGION) if COLLAPSE_DUPLICATES else None
+    cache = FrameCache(FRAME_CACHE_DIR, FRAME_CACHE_MAX_MB * 1024 * 1024) if FRAME_CACHE else None
+    width, palette_colors, frame_duration, video_fps = RESIZE_WIDTH, PALETTE_COLORS, FRAME_DURATION_MS, VIDEO_FPS
+    global_palette = GLOBAL_PALETTE
+    plan = None
+    if TARGET_SIZE_MB:
+        print(f"Finding the best settings for {TARGET_SIZE_MB} MB...")
+        planner = TargetSizePlanner(filenames, TARGET_SIZE_MB * 1024 * 1024, FRAME_DURATION_MS, OUTPUT_FORMAT,
+                                    workers, EXPOSURE, cache, TRANSPARENT_DELTAS, DELTA_TOLERANCE,
+                                    DUPLICATE_THRESHOLD if COLLAPSE_DUPLICATES else None, OVERLAY_REGION)
+        plan = planner.plan()
+        print(f"{'Picked' if plan.fits else '⚠️ Nothing fits; using the smallest'}: {plan.describe()} "
+              f"({plan.measured} test encodes in {plan.search_seconds:.1f}s)")
+        filenames = filenames[::plan.every]
+        width, frame_duration = plan.width, plan.duration_ms
+        video_fps = 1000 / frame_duration
+        if plan.colors:
+            palette_colors, global_palette = plan.colors, True
+
+    def timed_frames():
+        """Yields (frame, duration in ms) for the GIF, near-duplicates collapsed if enabled."""
+        frames = iter_frames(filenames, width, workers, EXPOSURE, cache)
+        if deduplicator:
+            return deduplicator.collapse(frames, frame_duration)
+        return ((frame, frame_duration) for frame in frames)
+
+    if OUTPUT_FORMAT != "gif":
+        print(f"Found {len(filenames)} images. Streaming them into a {OUTPUT_FORMAT} video at a width of "
+              f"{width}px ({workers} decode workers)...")
+        with VideoStreamWriter(output_filename, fps=video_fps, codec=VIDEO_CODEC) as video:
+            for frame in iter_frames(filenames, width, workers, EXPOSURE, cache):
+                video.append(frame)
+    elif STREAMING_MODE or plan:
+        print(f"Found {len(filenames)} images. Streaming them into a GIF at a width of {width}px "
+              f"({workers} decode workers)...")
+        palette = None
+        transparent_deltas = global_palette and TRANSPARENT_DELTAS
+        if global_palette:
+            # Leave one index free for the transparent colour
+            colors = min(palette_colors, 255) if transparent_deltas else palette_colors
+            samples = sample_evenly(filenames, PALETTE_SAMPLE_FRAMES)
+            print(f"Building a shared {colors}-colour palette from {len(samples)} sample frames...")
+            palette = GlobalPalette.from_frames(iter_frames(samples, width, workers, EXPOSURE, cache), colors)
+        with GifStreamWriter(output_filename, loop=0, optimize=True, palette=palette,
+                             transparent_deltas=transparent_deltas, delta_tolerance=DELTA_TOLERANCE) as gif:
+            for frame, duration in timed_frames():
+                gif.append(frame, duration=duration)
+    else:
+        print(f"Found {len(filenames)} images. Creating GIF...")
+
+        print(f"Resizing images to a width of {width}px ({workers} decode workers)...")
+        images, durations = zip(*split_long_frames(timed_frames()))
+
+        first_image = images[0]
+
+        print(f"Saving GIF as {output_filename}...")
+        first_image.save(
+            output_filename,
+            save_all=True,
+            append_images=list(images[1:]),
+            optimize=True,  # <-- Set to True for smaller file size
+            duration=list(durations),
+            loop=0
+        )
+
+    if deduplicator and OUTPUT_FORMAT == "gif":
+        print(deduplicator.summary())
+    if cache:
+        cache.trim()
+        print(cache.summary())
+
     # Get final file size for display
     file_size_mb = os.path.getsize(output_filename) / (1024 * 1024)
-    print(f"✨ Success! GIF created: {output_filename} ({file_size_mb:.2f} MB)")
\ No newline at end of file
+    print(f"✨ Success! {OUTPUT_FORMAT.upper()} created: {output_filename} ({file_size_mb:.2f} MB) in {time.time() - start_time:.1f}s")
+    if plan and file_size_mb > TARGET_SIZE_MB:
+        print(f"⚠️ That's over the {TARGET_SIZE_MB} MB target; lower TARGET_SIZE_MB a little and run again.")
+
+if __name__ == "__main__":
+    main()
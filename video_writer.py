@@ -0,0 +1,102 @@
+# Writes the timelapse as a compact MP4 or WebM video instead of a GIF.
+#
+# A GIF stores every frame as its own 256-colour picture, so an hour-long sit
+# at 960px is many megabytes and every frame has to be quantized. Video codecs
+# only store what changes from one frame to the next, and during a sit almost
+# nothing does, so the same frames come out a fraction of the size and encode
+# several times faster. Frames are written one at a time, like GifStreamWriter.
+#
+# Required libraries: opencv-python, Pillow, NumPy
+
+from PIL import Image
+import cv2
+import numpy as np
+import os
+import tempfile
+
+# Codec used when none is given, by file extension. These are the ones the
+# opencv-python wheels can always write (H.264 needs a system FFmpeg build).
+DEFAULT_CODECS = {
+    ".mp4": "mp4v",
+    ".m4v": "mp4v",
+    ".mov": "mp4v",
+    ".webm": "VP80",  # VP90 is smaller but encodes ~10x slower
+    ".avi": "MJPG",
+}
+
+
+def default_codec(filename):
+    return DEFAULT_CODECS.get(os.path.splitext(filename)[1].lower(), "mp4v")
+
+
+class VideoStreamWriter:
+    """
+    Appends frames to a video file with cv2.VideoWriter.
+
+    The file is opened on the first frame (its size sets the video size); later
+    frames of a different size are resized to match. Accepts Pillow images (RGB)
+    or BGR NumPy arrays as returned by cap.read().
+    """
+
+    def __init__(self, filename, fps=5.0, codec=None):
+        self.filename = filename
+        self.fps = fps
+        self.codec = codec or default_codec(filename)
+        self.frame_count = 0
+        self.size = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, frame):
+        if isinstance(frame, Image.Image):
+            frame = cv2.cvtColor(np.asarray(frame.convert("RGB")), cv2.COLOR_RGB2BGR)
+        if self._writer is None:
+            self._open(frame)
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self._writer.write(frame)
+        self.frame_count += 1
+
+    def check(self):
+        """
+        Raises IOError now if the file can't be written with this codec,
+        rather than on the first frame. Tries a temporary file of the same type
+        in the same folder, so nothing already at `filename` is touched.
+        """
+        folder, name = os.path.split(self.filename)
+        try:
+            fd, probe = tempfile.mkstemp(suffix=os.path.splitext(name)[1], prefix=".probe_", dir=folder or ".")
+        except OSError as e:
+            raise IOError(f"Cannot create '{self.filename}': {e.strerror}")
+        os.close(fd)
+        try:
+            writer = cv2.VideoWriter(probe, cv2.VideoWriter_fourcc(*self.codec), self.fps, (64, 64))
+            opened = writer.isOpened()
+            writer.release()
+        finally:
+            os.remove(probe)
+        if not opened:
+            raise IOError(self._open_error())
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def _open(self, frame):
+        height, width = frame.shape[:2]
+        # Most codecs need even dimensions (4:2:0 chroma); drop an odd pixel row/column
+        self.size = (width - width % 2, height - height % 2)
+        self._writer = cv2.VideoWriter(self.filename, cv2.VideoWriter_fourcc(*self.codec), self.fps, self.size)
+        if not self._writer.isOpened():
+            self._writer = None
+            raise IOError(self._open_error())
+
+    def _open_error(self):
+        return (f"OpenCV cannot write '{self.filename}' with codec '{self.codec}'. "
+                f"Try another codec, e.g. 'mp4v' for .mp4 or 'VP80' for .webm.")